@@ -1,7 +1,16 @@
+import hashlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 import pyodbc
 import os
 
+from flask.excel_readers import read_sheet, resolve_engine
+from flask.results_store import is_results_store, read_results, read_table
+
 server = '170.110.40.38'
 database = 'ept_modprev'
 username = 'usr_ept_modprev'
@@ -39,12 +48,121 @@ def drop_table(cursor, table_name):
         print(f"Error al eliminar la tabla {table_name}: {e}")
 
 
+# Largos fijos de NVARCHAR para las columnas de texto con valores acotados (códigos,
+# niveles e identificadores). No dependen de los datos de la primera carga, porque las
+# cargas por CUV posteriores reutilizan la tabla; el resto del texto (glosas, CdT,
+# preguntas, descripciones) usa NVARCHAR(MAX)
+NVARCHAR_LENGTHS = {
+    'CUV': 50,
+    'RUT': 20,
+    'RUT_empleador': 20,
+    'Folio': 50,
+    'Folio_y': 50,
+    'TE3': 400,
+    'Genero': 50,
+    'Rango_Edad': 50,
+    'Dimensión': 100,
+    'Coddim': 10,
+    'Codpreg': 10,
+    'Nivel': 50,
+    'Riesgo': 50,
+}
+
+# Sufijo de las columnas de nivel de riesgo por dimensión ('<Coddim>_riesgo')
+RISK_SUFFIX = '_riesgo'
+
+# Columnas con porcentajes redondeados a 2 decimales (0 a 100)
+DECIMAL_COLUMNS = {'Porcentaje'}
+
+# Índices por tabla: agrupado por CUV y no agrupado por (CUV, TE3), si existen las columnas
+CLUSTERED_INDEX = ['CUV']
+NONCLUSTERED_INDEX = ['CUV', 'TE3']
+
+# Bytes máximos de la clave de un índice agrupado y de uno no agrupado en SQL Server
+MAX_KEY_BYTES = {'CLUSTERED': 900, 'NONCLUSTERED': 1700}
+
+
+def clean_column_name(column_name):
+    return column_name.replace(' ', '_').replace('-', '_')
+
+
+# Nombres de columna para SQL y CUV entero cuando todos sus valores son enteros
+# (en algunas hojas el CUV llega como texto o como decimal)
+def prepare_frame(df):
+    df = df.rename(columns=clean_column_name)
+    if 'CUV' in df.columns and not pd.api.types.is_integer_dtype(df['CUV']):
+        cuv = pd.to_numeric(df['CUV'].astype(object), errors='coerce')
+        if cuv.notna().sum() == df['CUV'].notna().sum() and (cuv.dropna() % 1 == 0).all():
+            df['CUV'] = cuv.astype('Int64')
+    return df
+
+
+def _nvarchar_type(column_name):
+    length = NVARCHAR_LENGTHS.get(column_name)
+    if length is None and column_name.endswith(RISK_SUFFIX):
+        length = NVARCHAR_LENGTHS['Nivel']
+    return f"NVARCHAR({length})" if length else "NVARCHAR(MAX)"
+
+
+# Tipo SQL de una columna según su dtype y su nombre, nunca según los valores: los enteros
+# (CUV y conteos) son siempre BIGINT y el largo del texto viene de NVARCHAR_LENGTHS
+def sql_type(column_name, values):
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        values = values.astype(dtype.categories.dtype)
+        dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BIT"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "BIGINT"
+    if pd.api.types.is_float_dtype(dtype):
+        return "DECIMAL(5, 2)" if column_name in DECIMAL_COLUMNS else "FLOAT"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "DATETIME2"
+    return _nvarchar_type(column_name)
+
+
+def _key_bytes(sql_types, columns):
+    sizes = {"BIGINT": 8}
+    total = 0
+    for col in columns:
+        column_type = sql_types[col]
+        if column_type.startswith("NVARCHAR("):
+            length = column_type[len("NVARCHAR("):-1]
+            if length == "MAX":
+                return None
+            total += 2 * int(length)
+        else:
+            total += sizes.get(column_type, 8)
+    return total
+
+
+def create_indexes(cursor, table_name, sql_types):
+    for kind, columns in [('CLUSTERED', CLUSTERED_INDEX), ('NONCLUSTERED', NONCLUSTERED_INDEX)]:
+        if not all(col in sql_types for col in columns):
+            continue
+        key_bytes = _key_bytes(sql_types, columns)
+        if key_bytes is None or key_bytes > MAX_KEY_BYTES[kind]:
+            print(f"Tabla {table_name}: sin índice {kind.lower()} en ({', '.join(columns)}), la clave es demasiado larga.")
+            continue
+        index_name = f"IX_{table_name}_{'_'.join(columns)}"
+        index_columns = ", ".join(f"[{col}]" for col in columns)
+        try:
+            cursor.execute(f"CREATE {kind} INDEX [{index_name}] ON {table_name} ({index_columns});")
+            cursor.commit()
+            print(f"Índice {index_name} creado exitosamente.")
+        except pyodbc.Error as e:
+            print(f"Error al crear el índice {index_name}: {e}")
+
+
+# Tipos SQL de las columnas de df (ya pasado por prepare_frame)
+def frame_types(df):
+    return {column_name: sql_type(column_name, df[column_name]) for column_name in df.columns}
+
+
 def create_table(cursor, table_name, df):
-    # Mapear todo a NVARCHAR(MAX)
-    columns = []
-    for column_name in df.columns:
-        column_name_clean = column_name.replace(' ', '_').replace('-', '_')
-        columns.append(f"[{column_name_clean}] NVARCHAR(MAX)")
+    sql_types = frame_types(df)
+    columns = [f"[{column_name}] {column_type}" for column_name, column_type in sql_types.items()]
 
     columns_def = ",\n    ".join(columns)
     create_table_sql = f"""
@@ -58,71 +176,329 @@ def create_table(cursor, table_name, df):
         print(f"Tabla {table_name} creada exitosamente.")
     except pyodbc.Error as e:
         print(f"Error al crear la tabla {table_name}: {e}")
+        return
+    create_indexes(cursor, table_name, sql_types)
 
 
-def insert_data(cursor, table_name, df):
-    # Convertir todo a string
-    df = df.applymap(lambda x: str(x) if pd.notnull(x) else None)
-    df.columns = [col.replace(' ', '_').replace('-', '_') for col in df.columns]
+# Filas por bloque al insertar: se convierten y se envían de a un bloque, para no tener
+# en memoria todas las filas como tuplas de Python
+CHUNK_ROWS = 10000
+
+# Hojas que se cargan a la vez, cada una con su propia conexión
+PARALLEL_SHEETS = 4
+
+
+# Filas como tuplas de valores de Python (None en los vacíos), en el tipo de cada columna
+def sql_rows(df):
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(values.dtype.categories.dtype)
+        values = values.astype(object)
+        columns.append(values.where(values.notna(), None).tolist())
+    return list(zip(*columns))
+
+
+# Inserta df por bloques de CHUNK_ROWS filas con fast_executemany, informando el avance.
+# No confirma la transacción; eso queda a cargo de quien llama
+def bulk_insert(cursor, table_name, df, chunk_rows=CHUNK_ROWS):
     columns = ", ".join([f"[{col}]" for col in df.columns])
     placeholders = ", ".join(["?" for _ in df.columns])
     insert_sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
 
+    cursor.fast_executemany = True
+    total = len(df)
+    start_time = time.perf_counter()
+    for start in range(0, total, chunk_rows):
+        cursor.executemany(insert_sql, sql_rows(df.iloc[start:start + chunk_rows]))
+        done = min(start + chunk_rows, total)
+        elapsed = time.perf_counter() - start_time
+        rate = done / elapsed if elapsed > 0 else float('inf')
+        print(f"{table_name}: {done}/{total} filas insertadas ({rate:,.0f} filas/s).")
+
+
+def insert_data(cursor, table_name, df):
     try:
-        data = [tuple(row) for row in df.itertuples(index=False, name=None)]
-        cursor.fast_executemany = True
-        cursor.executemany(insert_sql, data)
+        bulk_insert(cursor, table_name, df)
         cursor.commit()
         print(f"Datos insertados en la tabla {table_name} exitosamente.")
+        return True
     except pyodbc.Error as e:
+        cursor.rollback()
         print(f"Error al insertar datos en la tabla {table_name}: {e}")
+        return False
 
 
-def main():
-    excel_path = r'H:\Mi unidad\SM-CEAL\salida_test.xlsx'
-    sheet_names = [
-        'basecompleta',
-        'Summary',
-        'resultado',
-        'df_porcentajes_niveles',
-        'df_res_dimTE3',
-        'df_resumen',
-        'top_glosas'
-    ]
+# Tabla con la huella del contenido de cada CUV cargado, por tabla
+HASH_TABLE = 'informe_CEAL__hash_cuv'
+
 
+def ensure_hash_table(cursor):
+    cursor.execute(f"""
+    IF OBJECT_ID('{HASH_TABLE}', 'U') IS NULL
+    CREATE TABLE {HASH_TABLE} (
+        [Tabla] NVARCHAR(128) NOT NULL,
+        [CUV] NVARCHAR(50) NOT NULL,
+        [Hash] CHAR(64) NOT NULL,
+        PRIMARY KEY ([Tabla], [CUV])
+    );
+    """)
+    cursor.commit()
+
+
+# Huella del contenido de cada CUV: sha256 de los nombres de columna y de los hash de
+# sus filas ordenados, de modo que no depende del orden de las filas
+def cuv_hashes(df):
+    row_hashes = pd.Series(pd.util.hash_pandas_object(df, index=False).to_numpy(),
+                           index=df['CUV'].astype(str).to_numpy())
+    header = "\0".join(df.columns).encode('utf-8')
+    return {
+        cuv: hashlib.sha256(header + np.sort(values.to_numpy()).tobytes()).hexdigest()
+        for cuv, values in row_hashes.groupby(level=0)
+    }
+
+
+def stored_hashes(cursor, table_name):
+    cursor.execute(f"SELECT [CUV], [Hash] FROM {HASH_TABLE} WHERE [Tabla] = ?", table_name)
+    return {cuv: cuv_hash for cuv, cuv_hash in cursor.fetchall()}
+
+
+# Tipos de las columnas de una tabla existente, en el mismo formato que sql_type
+def table_types(cursor, table_name):
+    cursor.execute("SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE "
+                   "FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = ? ORDER BY ORDINAL_POSITION", table_name)
+    types = {}
+    for column_name, data_type, length, precision, scale in cursor.fetchall():
+        data_type = data_type.upper()
+        if data_type == "NVARCHAR":
+            data_type = f"NVARCHAR({'MAX' if length == -1 else length})"
+        elif data_type == "DECIMAL":
+            data_type = f"DECIMAL({precision}, {scale})"
+        types[column_name] = data_type
+    return types
+
+
+# Guarda las huellas de todos los CUV de una tabla recién cargada completa
+def record_hashes(connection, table_name, df):
+    cursor = connection.cursor()
     try:
-        print("Leyendo el archivo Excel...")
-        excel_data = pd.read_excel(excel_path, sheet_name=sheet_names)
-        print("Archivo Excel leído exitosamente.")
-    except Exception as e:
-        print(f"Error al leer el archivo Excel: {e}")
-        excel_data = {}
+        cursor.execute(f"DELETE FROM {HASH_TABLE} WHERE [Tabla] = ?", table_name)
+        data = [(table_name, cuv, cuv_hash) for cuv, cuv_hash in cuv_hashes(df).items()]
+        if data:
+            cursor.fast_executemany = True
+            cursor.executemany(f"INSERT INTO {HASH_TABLE} ([Tabla], [CUV], [Hash]) VALUES (?, ?, ?)", data)
+        connection.commit()
+    except pyodbc.Error as e:
+        connection.rollback()
+        print(f"Error al guardar las huellas de la tabla {table_name}: {e}")
+    finally:
+        cursor.close()
+
+
+# Reemplaza las filas de los CUV indicados con las filas de df (los CUV sin filas en df se
+# eliminan). Las filas nuevas se cargan primero en una tabla temporal; después, en una sola
+# transacción, se borran las particiones, se insertan desde la tabla temporal y se actualizan
+# sus huellas con MERGE. Los lectores ven las filas anteriores o las nuevas, nunca la tabla vacía.
+def merge_partitions(connection, table_name, df, cuvs, hashes=None):
+    cuvs = [str(cuv) for cuv in cuvs]
+    if hashes is None:
+        hashes = cuv_hashes(df)
+    df = df[df['CUV'].astype(str).isin(cuvs)]
+    columns = ", ".join([f"[{col}]" for col in df.columns])
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT TOP 0 {columns} INTO #carga FROM {table_name};")
+        bulk_insert(cursor, "#carga", df)
+        cursor.execute("CREATE TABLE #cuvs ([CUV] NVARCHAR(50) PRIMARY KEY, [Hash] CHAR(64) NULL);")
+        cursor.executemany("INSERT INTO #cuvs ([CUV], [Hash]) VALUES (?, ?)", [(cuv, hashes.get(cuv)) for cuv in cuvs])
+
+        cursor.execute(f"DELETE FROM {table_name} WHERE [CUV] IN (SELECT [CUV] FROM #cuvs);")
+        cursor.execute(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM #carga;")
+        cursor.execute(f"""
+        MERGE {HASH_TABLE} AS destino
+        USING (SELECT ? AS [Tabla], [CUV], [Hash] FROM #cuvs) AS origen
+        ON destino.[Tabla] = origen.[Tabla] AND destino.[CUV] = origen.[CUV]
+        WHEN MATCHED AND origen.[Hash] IS NULL THEN DELETE
+        WHEN MATCHED THEN UPDATE SET [Hash] = origen.[Hash]
+        WHEN NOT MATCHED BY TARGET AND origen.[Hash] IS NOT NULL THEN
+            INSERT ([Tabla], [CUV], [Hash]) VALUES (origen.[Tabla], origen.[CUV], origen.[Hash]);
+        """, table_name)
+        cursor.execute("DROP TABLE #carga; DROP TABLE #cuvs;")
+        connection.commit()
+        print(f"Tabla {table_name}: {len(df)} filas reemplazadas para {len(cuvs)} CUV.")
+        return True
+    except pyodbc.Error as e:
+        connection.rollback()
+        print(f"Error al actualizar la tabla {table_name}: {e}")
+        return False
+    finally:
+        cursor.close()
+
+
+# Reemplaza solo las filas de los CUV indicados (ver merge_partitions)
+def replace_cuv_partitions(connection, table_name, df, cuvs):
+    cursor = connection.cursor()
+    try:
+        ensure_hash_table(cursor)
+    finally:
+        cursor.close()
+    return merge_partitions(connection, table_name, prepare_frame(df), cuvs)
+
+
+# Carga incremental: solo los CUV nuevos, modificados o eliminados según su huella.
+# Retorna False si la tabla no admite la carga incremental o si falló (hay que cargarla completa).
+# Las tablas con otras columnas o tipos (por ejemplo, creadas con largos de texto según los
+# datos) se cargan completas, para recrearlas con los tipos de frame_types
+def load_incremental(connection, table_name, df):
+    cursor = connection.cursor()
+    try:
+        if not table_exists(cursor, table_name):
+            return False
+        if list(table_types(cursor, table_name).items()) != list(frame_types(df).items()):
+            print(f"Tabla {table_name}: las columnas o sus tipos cambiaron; se carga completa.")
+            return False
+        stored = stored_hashes(cursor, table_name)
+    finally:
+        cursor.close()
+    if not stored or df['CUV'].isna().any():
+        return False
+
+    current = cuv_hashes(df)
+    changed = [cuv for cuv, cuv_hash in current.items() if stored.get(cuv) != cuv_hash]
+    removed = [cuv for cuv in stored if cuv not in current]
+    if not changed and not removed:
+        print(f"Tabla {table_name}: sin cambios.")
+        return True
+    print(f"Tabla {table_name}: {len(changed)} CUV nuevos o modificados y {len(removed)} eliminados.")
+    return merge_partitions(connection, table_name, df, changed + removed, current)
+
+
+def load_full(connection, table_name, df):
+    cursor = connection.cursor()
+
+    # Elimina la tabla si existe, para asegurar nuevo esquema
+    drop_table(cursor, table_name)
+
+    # Crea la tabla siempre, con tipos según los datos e índices por CUV
+    create_table(cursor, table_name, df)
+
+    # Inserta datos
+    print(f"Insertando datos en {table_name}...")
+    inserted = insert_data(cursor, table_name, df)
+    cursor.close()
+
+    if inserted and 'CUV' in df.columns:
+        record_hashes(connection, table_name, df)
+    return inserted
+
+
+# Hojas del almacén de resultados que se cargan como tablas informe_CEAL__<hoja>
+sheet_names = [
+    'basecompleta',
+    'Summary',
+    'resultado',
+    'df_porcentajes_niveles',
+    'df_res_dimTE3',
+    'df_resumen',
+    'top_glosas',
+    'cubo_niveles',
+    'cubo_celdas'
+]
+
+# Hojas del cubo de conteos: los almacenes y archivos Excel anteriores no las tienen,
+# así que se leen aparte y se omiten si no existen
+optional_sheet_names = ['cubo_niveles', 'cubo_celdas']
+
+
+# Lee las hojas opcionales que existan en el almacén de resultados o en el archivo Excel
+def read_optional_sheets(source_path, from_store):
+    if not from_store:
+        available = pd.ExcelFile(source_path, engine=resolve_engine()).sheet_names
+    optional_data = {}
+    for sheet_name in optional_sheet_names:
+        try:
+            if from_store:
+                optional_data[sheet_name] = read_table(source_path, sheet_name)
+            elif sheet_name in available:
+                optional_data[sheet_name] = read_sheet(source_path, sheet_name=sheet_name)
+            else:
+                print(f"La hoja {sheet_name} no existe; se omite.")
+        except FileNotFoundError:
+            print(f"La tabla {sheet_name} no existe en el almacén de resultados; se omite.")
+    return optional_data
+
+
+# Carga una hoja con su propia conexión, para poder cargar varias hojas a la vez
+def load_sheet(sheet_name, df, incremental=True):
+    print(f"\nProcesando hoja: {sheet_name}")
+    table_name = f"informe_CEAL__{sheet_name}"
+    df = prepare_frame(df)
 
     connection = get_db_connection()
     if connection is None:
-        return
+        return False
 
-    cursor = connection.cursor()
+    try:
+        # Solo los CUV que cambiaron; si la tabla no existe o cambió su esquema, se carga completa
+        if incremental and 'CUV' in df.columns and load_incremental(connection, table_name, df):
+            print(f"Finalizada la carga incremental para {table_name}.")
+            return True
 
-    for sheet_name, df in excel_data.items():
-        print(f"\nProcesando hoja: {sheet_name}")
-        table_name = f"informe_CEAL__{sheet_name}"
+        loaded = load_full(connection, table_name, df)
+        if loaded:
+            print(f"Finalizada la carga para {table_name}.")
+        return loaded
+    finally:
+        connection.close()
 
-        # Elimina la tabla si existe, para asegurar nuevo esquema
-        drop_table(cursor, table_name)
 
-        # Crea la tabla siempre (NVARCHAR(MAX))
-        create_table(cursor, table_name, df)
+def main(incremental=True, workers=PARALLEL_SHEETS):
+    excel_path = r'H:\Mi unidad\SM-CEAL\salida_test.xlsx'
+    results_path = r'H:\Mi unidad\SM-CEAL\resultados_ceal'
 
-        # Inserta datos
-        print(f"Insertando datos en {table_name}...")
-        insert_data(cursor, table_name, df)
-        print(f"Finalizada la carga para {table_name}.")
+    required_sheet_names = [name for name in sheet_names if name not in optional_sheet_names]
+    try:
+        if is_results_store(results_path):
+            print("Leyendo el almacén de resultados...")
+            excel_data = read_results(results_path, required_sheet_names)
+            excel_data.update(read_optional_sheets(results_path, from_store=True))
+        else:
+            print("Leyendo el archivo Excel...")
+            excel_data = read_sheet(excel_path, sheet_name=required_sheet_names)
+            excel_data.update(read_optional_sheets(excel_path, from_store=False))
+        print("Datos leídos exitosamente.")
+    except Exception as e:
+        print(f"Error al leer los datos: {e}")
+        excel_data = {}
 
+    connection = get_db_connection()
+    if connection is None:
+        return
+    cursor = connection.cursor()
+    ensure_hash_table(cursor)
     cursor.close()
     connection.close()
-    print("\nProceso completado.")
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {sheet_name: executor.submit(load_sheet, sheet_name, df, incremental)
+                   for sheet_name, df in excel_data.items()}
+    failed = []
+    for sheet_name, future in futures.items():
+        try:
+            if not future.result():
+                failed.append(sheet_name)
+        except Exception as e:
+            print(f"Error al cargar la hoja {sheet_name}: {e}")
+            failed.append(sheet_name)
+
+    if failed:
+        print(f"\nHojas no cargadas: {', '.join(failed)}")
+    print(f"\nProceso completado en {time.perf_counter() - start_time:.1f} s.")
 
 
 if __name__ == "__main__":
-    main()
+    # python Cargatablas.py --completa: elimina y vuelve a cargar todas las tablas
+    main(incremental='--completa' not in sys.argv[1:])
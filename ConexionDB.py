@@ -2,6 +2,8 @@ import streamlit as st
 import pyodbc
 import pandas as pd
 
+from flask.db_pool import ConnectionPool
+
 # Configuración de la base de datos para SQL Server
 server = '170.110.40.38'
 database = 'ept_modprev'
@@ -15,15 +17,19 @@ def get_db_connection():
         f'DRIVER={driver};SERVER={server};DATABASE={database};UID={username};PWD={password}'
     )
 
+# Pool de conexiones compartido por todas las sesiones de la aplicación
+@st.cache_resource
+def obtener_pool():
+    return ConnectionPool(get_db_connection)
+
 # Consulta SQL para obtener combinaciones únicas
 def fetch_unique_combinations():
     query = """
     SELECT DISTINCT RUT, CUV, CdT
     FROM archivo_combinado
     """
-    connection = get_db_connection()
-    df = pd.read_sql(query, connection)
-    connection.close()
+    with obtener_pool().connection() as connection:
+        df = pd.read_sql(query, connection)
     return df
 
 # Interfaz Streamlit
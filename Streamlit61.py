@@ -16,10 +16,15 @@ import logging
 import os
 import base64
 from datetime import timedelta, datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict
 # Eliminar AgGrid
 # from st_aggrid import AgGrid, GridOptionsBuilder
 from dotenv import load_dotenv
 
+from flask.db_pool import ConnectionPool
+from flask.schema import apply_schema
+
 # Cargar variables de entorno desde un archivo .env
 load_dotenv()
 
@@ -58,53 +63,94 @@ Por favor, cargue los archivos necesarios y siga las instrucciones.
 def get_db_connection():
     """
     Establece una conexión con la base de datos SQL Server.
-    Retorna el objeto de conexión si es exitosa, de lo contrario detiene la aplicación.
+
+    La usa el pool desde los hilos de consulta, por lo que no llama a Streamlit: si la
+    conexión falla, el error (pyodbc.Error) se propaga y se informa en el hilo principal.
     """
-    try:
-        connection = pyodbc.connect(
-            f'DRIVER={driver};'
-            f'SERVER={server};'
-            f'DATABASE={database};'
-            f'UID={username};'
-            f'PWD={password}'
-        )
-        logging.info("Conexión a la base de datos establecida exitosamente.")
-        return connection
-    except pyodbc.Error as e:
-        st.error(f"Error al conectar a la base de datos: {e}")
-        logging.error(f"Error al conectar a la base de datos: {e}")
-        st.stop()
+    connection = pyodbc.connect(
+        f'DRIVER={driver};'
+        f'SERVER={server};'
+        f'DATABASE={database};'
+        f'UID={username};'
+        f'PWD={password}'
+    )
+    logging.info("Conexión a la base de datos establecida exitosamente.")
+    return connection
+
+
+# Tablas que se pueden consultar desde la aplicación
+TABLAS_PERMITIDAS = {
+    "informe_CEAL__Summary",
+    "informe_CEAL__basecompleta",
+    "informe_CEAL__df_porcentajes_niveles",
+    "informe_CEAL__df_res_dimTE3",
+    "informe_CEAL__df_resumen",
+    "informe_CEAL__resultado",
+    "informe_CEAL__top_glosas",
+    "informe_CEAL__fileresultados",
+    "informe_CEAL__ciiu",
+    "informe_CEAL__rec"
+}
+
+# Tabla de origen de cada DataFrame de la búsqueda por CUV (clave de st.session_state)
+# y si se filtra por CUV. 'df_resultados' se obtiene de 'df_res_com'.
+TABLAS_BUSQUEDA = {
+    'combined_df_base_complet3': ("informe_CEAL__basecompleta", True),
+    'summary_df': ("informe_CEAL__Summary", True),
+    'df_porcentajes_niveles': ("informe_CEAL__df_porcentajes_niveles", True),
+    'df_res_dimTE3': ("informe_CEAL__df_res_dimTE3", True),
+    'df_resumen': ("informe_CEAL__df_resumen", True),
+    'df_resultados_porcentaje': ("informe_CEAL__resultado", True),
+    'top_glosas': ("informe_CEAL__top_glosas", True),
+    'df_res_com': ("informe_CEAL__fileresultados", True),
+    'df_ciiu': ("informe_CEAL__ciiu", False),
+    'df_recomendaciones': ("informe_CEAL__rec", False),
+}
+
+
+class ResultadosCUV(TypedDict):
+    """
+    DataFrames de la búsqueda por CUV, con las claves que se guardan en st.session_state.
+    """
+    combined_df_base_complet3: pd.DataFrame
+    summary_df: pd.DataFrame
+    df_porcentajes_niveles: pd.DataFrame
+    df_res_dimTE3: pd.DataFrame
+    df_resumen: pd.DataFrame
+    df_resultados_porcentaje: pd.DataFrame
+    top_glosas: pd.DataFrame
+    df_res_com: pd.DataFrame
+    df_resultados: pd.DataFrame
+    df_ciiu: pd.DataFrame
+    df_recomendaciones: pd.DataFrame
+
+
+# Pool de conexiones compartido por todas las sesiones de la aplicación
+@st.cache_resource
+def obtener_pool():
+    """
+    Retorna el pool de conexiones del proceso; las consultas reutilizan sus conexiones
+    en lugar de abrir una conexión nueva por tabla.
+    """
+    # Una conexión por tabla de la búsqueda, para consultarlas todas a la vez
+    return ConnectionPool(get_db_connection, size=len(TABLAS_BUSQUEDA))
 
 
-# Función para consultar una tabla específica filtrando por CUV
-def consultar_tabla(tabla, cuv=None, columnas=None):
+def leer_tabla(tabla, cuv=None, columnas=None):
     """
-    Realiza una consulta SQL a una tabla específica filtrando por CUV si se proporciona.
+    Lee una tabla filtrando por CUV si se proporciona. No usa funciones de Streamlit,
+    de modo que se puede llamar desde otros hilos; los errores se propagan.
 
     Parámetros:
-    - tabla (str): Nombre de la tabla en la base de datos.
+    - tabla (str): Nombre de la tabla en la base de datos (debe estar en TABLAS_PERMITIDAS).
     - cuv (str, opcional): Valor del CUV a filtrar.
     - columnas (list[str], opcional): Lista de columnas a seleccionar. Si no se especifica, se seleccionan todas.
 
     Retorna:
     - pd.DataFrame: DataFrame con los resultados de la consulta.
     """
-    tablas_permitidas = {
-        "informe_CEAL__Summary",
-        "informe_CEAL__basecompleta",
-        "informe_CEAL__df_porcentajes_niveles",
-        "informe_CEAL__df_res_dimTE3",
-        "informe_CEAL__df_resumen",
-        "informe_CEAL__resultado",
-        "informe_CEAL__top_glosas",
-        "informe_CEAL__fileresultados",
-        "informe_CEAL__ciiu",
-        "informe_CEAL__rec"
-    }
-
-    if tabla not in tablas_permitidas:
-        st.error(f"Tabla '{tabla}' no permitida.")
-        return pd.DataFrame()
+    if tabla not in TABLAS_PERMITIDAS:
+        raise ValueError(f"Tabla '{tabla}' no permitida.")
 
     columnas_sql = ", ".join(columnas) if columnas else "*"
     query = f"SELECT {columnas_sql} FROM {tabla}"
@@ -112,23 +158,50 @@ def consultar_tabla(tabla, cuv=None, columnas=None):
     if cuv:
         query += " WHERE CUV = ?"
 
-    connection = get_db_connection()
+    with obtener_pool().connection() as connection:
+        df = pd.read_sql(query, connection, params=params)
+    # Tipos declarados; el CUV se mantiene como texto porque se compara con el CUV ingresado
+    df = apply_schema(df, tabla, cuv_dtype='category')
+    logging.info(
+        f"Consulta ejecutada en la tabla '{tabla}' para CUV: {cuv}" if cuv else f"Consulta ejecutada en la tabla '{tabla}'")
+    return df
 
-    if connection:
+
+# Función para consultar todas las tablas de un CUV
+def consultar_cuv(cuv) -> ResultadosCUV:
+    """
+    Consulta a la vez todas las tablas de la búsqueda por CUV, cada una con su propia
+    conexión del pool, de modo que la búsqueda tarda lo que la consulta más lenta y no
+    la suma de todas. 'informe_CEAL__fileresultados' se lee una sola vez y 'df_resultados'
+    es su proyección a ['CUV', 'Folio'].
+
+    Parámetros:
+    - cuv (str): Valor del CUV a filtrar.
+
+    Retorna:
+    - ResultadosCUV: Un DataFrame por clave (vacío si la consulta de su tabla falló).
+    """
+    with ThreadPoolExecutor(max_workers=len(TABLAS_BUSQUEDA)) as executor:
+        futuros = {
+            clave: executor.submit(leer_tabla, tabla, cuv if por_cuv else None)
+            for clave, (tabla, por_cuv) in TABLAS_BUSQUEDA.items()
+        }
+
+    # Los errores se informan en el hilo de Streamlit
+    resultados = {}
+    for clave, futuro in futuros.items():
+        tabla = TABLAS_BUSQUEDA[clave][0]
         try:
-            df = pd.read_sql(query, connection, params=params)
-            logging.info(
-                f"Consulta ejecutada en la tabla '{tabla}' para CUV: {cuv}" if cuv else f"Consulta ejecutada en la tabla '{tabla}'")
-            return df
+            resultados[clave] = futuro.result()
         except Exception as e:
             st.error(f"Error al consultar la tabla '{tabla}': {e}")
             logging.error(f"Error al consultar la tabla '{tabla}': {e}")
-            return pd.DataFrame()
-        finally:
-            connection.close()
-            logging.info("Conexión a la base de datos cerrada.")
-    else:
-        return pd.DataFrame()
+            resultados[clave] = pd.DataFrame()
+
+    df_res_com = resultados['df_res_com']
+    columnas_fileresultados = [col for col in ['CUV', 'Folio'] if col in df_res_com.columns]
+    resultados['df_resultados'] = df_res_com[columnas_fileresultados].copy()
+    return ResultadosCUV(**resultados)
 
 
 # Función para extraer y validar 'codigo_ciiu'
@@ -207,33 +280,7 @@ if proceso_actual == "Búsqueda":
 
 
 
-    ############### Parte 2: Definición de Tablas y Búsqueda por CUV ################
-
-    # Lista de tablas a consultar en la base de datos
-    tablas_a_consultar = [
-        "informe_CEAL__Summary",
-        "informe_CEAL__basecompleta",
-        "informe_CEAL__df_porcentajes_niveles",
-        "informe_CEAL__df_res_dimTE3",
-        "informe_CEAL__df_resumen",
-        "informe_CEAL__resultado",
-        "informe_CEAL__top_glosas",
-        "informe_CEAL__fileresultados"
-    ]
-
-    # Mapeo de nombres de tablas a nombres amigables para su visualización en la interfaz
-    nombres_amigables = {
-        "informe_CEAL__Summary": "Summary",
-        "informe_CEAL__basecompleta": "BaseCompleta",
-        "informe_CEAL__df_porcentajes_niveles": "Porcentajes Niveles",
-        "informe_CEAL__df_res_dimTE3": "Res Dim TE3",
-        "informe_CEAL__df_resumen": "Resumen",
-        "informe_CEAL__resultado": "Resultado",
-        "informe_CEAL__top_glosas": "Top Glosas",
-        "informe_CEAL__fileresultados": "Filas Resultados",
-        "informe_CEAL__ciiu": "CIIU",
-        "informe_CEAL__rec": "Recomendaciones"
-    }
+    ############### Parte 2: Búsqueda por CUV ################
 
     # Título y cuadro de texto para ingresar el CUV
     st.header("Aplicación de Búsqueda por CUV")
@@ -265,42 +312,10 @@ if proceso_actual == "Búsqueda":
         else:
             st.header(f"Resultados para CUV: {cuv_valor}")
 
-            # Diccionario para almacenar los DataFrames resultantes de cada tabla
-            resultados = {}
-
-            # Consultar tablas sin filtrar por CUV (recomendaciones generales)
-            # Ahora, las recomendaciones serán específicas por Sección
-            resultados["df_recomendaciones"] = consultar_tabla("informe_CEAL__rec")
-            resultados["df_ciiu"] = consultar_tabla("informe_CEAL__ciiu")
-
-            # Consultar cada tabla y almacenar el resultado
-            for tabla in tablas_a_consultar:
-                nombre_amigable = nombres_amigables.get(tabla, tabla)
-
-                # Caso especial para la tabla 'informe_CEAL__fileresultados'
-                if tabla == "informe_CEAL__fileresultados":
-                    columnas_fileresultados = ['CUV', 'Folio']
-                    df_resultados = consultar_tabla(tabla, cuv_valor, columnas=columnas_fileresultados)
-                    resultados["df_resultados"] = df_resultados
-
-                    df_res_com = consultar_tabla(tabla, cuv_valor)  # Todas las columnas
-                    resultados["df_res_com"] = df_res_com
-                else:
-                    df = consultar_tabla(tabla, cuv_valor)
-                    resultados[nombre_amigable] = df
-
-            # Asignar DataFrames a st.session_state
-            st.session_state.combined_df_base_complet3 = resultados.get("BaseCompleta", pd.DataFrame())
-            st.session_state.summary_df = resultados.get("Summary", pd.DataFrame())
-            st.session_state.df_porcentajes_niveles = resultados.get("Porcentajes Niveles", pd.DataFrame())
-            st.session_state.df_res_dimTE3 = resultados.get("Res Dim TE3", pd.DataFrame())
-            st.session_state.df_resumen = resultados.get("Resumen", pd.DataFrame())
-            st.session_state.df_resultados_porcentaje = resultados.get("Resultado", pd.DataFrame())
-            st.session_state.top_glosas = resultados.get("Top Glosas", pd.DataFrame())
-            st.session_state.df_resultados = resultados.get("df_resultados", pd.DataFrame())
-            st.session_state.df_res_com = resultados.get("df_res_com", pd.DataFrame())
-            st.session_state.df_ciiu = resultados.get("df_ciiu", pd.DataFrame())
-            st.session_state.df_recomendaciones = resultados.get("df_recomendaciones", pd.DataFrame())
+            # Consultar todas las tablas del CUV a la vez y guardarlas en st.session_state
+            resultados = consultar_cuv(cuv_valor)
+            for var, df in resultados.items():
+                st.session_state[var] = df
 
             df_ciiu = st.session_state.df_ciiu
 
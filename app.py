@@ -11,6 +11,7 @@ from docx import Document
 from datetime import datetime
 import pyodbc
 import threading
+import os
 
 # 1. Configuración de la página (Debe ser la primera función de Streamlit)
 st.set_page_config(page_title="Generador de Informes de Riesgos Psicosociales")
@@ -30,8 +31,13 @@ Por favor, cargue los archivos necesarios y siga las instrucciones.
 # 3. Sección 1: Carga de archivos
 st.header("1. Carga de archivos")
 
-# Cargar el archivo Excel con múltiples hojas
-uploaded_file_combined = st.file_uploader("Selecciona el archivo 'combined_output.xlsx'", type="xlsx")
+# Usar el almacén de resultados (Parquet) si existe; si no, cargar el archivo Excel con múltiples hojas
+ruta_resultados = 'resultados_ceal'
+if os.path.isdir(ruta_resultados):
+    st.info(f"Usando el almacén de resultados '{ruta_resultados}'.")
+    uploaded_file_combined = ruta_resultados
+else:
+    uploaded_file_combined = st.file_uploader("Selecciona el archivo 'combined_output.xlsx'", type="xlsx")
 
 # Cargar los archivos de recomendaciones y códigos CIIU
 # uploaded_file_rec = st.file_uploader("Selecciona el archivo 'Recomendaciones2.xlsx'", type="xlsx")
@@ -1,41 +1,151 @@
 import pandas as pd
 import unicodedata
 import streamlit as st
+from collections.abc import Mapping
+
+from flask.excel_readers import resolve_engine
+from flask.results_store import is_results_store, read_table, table_columns
+from flask.schema import apply_schema
+
+
+# Hojas disponibles: clave -> (archivo, hoja, columnas)
+HOJAS_DATOS = {
+    'df_res_com': ('resultados', 'Datos', None),
+    'combined_df_base_complet3': ('combined', 'basecompleta', None),
+    'summary_df': ('combined', 'Summary', None),
+    'df_resultados_porcentaje': ('combined', 'resultado', None),
+    'df_porcentajes_niveles': ('combined', 'df_porcentajes_niveles', None),
+    'df_res_dimTE3': ('combined', 'df_res_dimTE3', None),
+    'df_resumen': ('combined', 'df_resumen', None),
+    'top_glosas': ('combined', 'top_glosas', None),
+    'df_rec': ('recomendaciones', 'Hoja1', None),
+    'df_ciiu': ('ciiu', 'ciiu', None),
+    'df_resultados': ('resultados', 'Datos', ['CUV', 'Folio']),
+    'df_res_com_resultados': ('resultados', 'Datos', None),
+}
+
+
+def _cuv_a_int64(df):
+    df['CUV'] = pd.to_numeric(df['CUV'], errors='coerce').astype('Int64')
+    return df
+
+
+def _cuv_a_texto(df):
+    if 'CUV' in df.columns:
+        df['CUV'] = df['CUV'].astype(str)
+    return df
+
+
+# Conversiones propias de algunas claves, aplicadas al leerlas
+CONVERSIONES = {
+    'df_resultados': _cuv_a_int64,
+}
+
+
+class DatosCargados(Mapping):
+    """
+    Diccionario de DataFrames que lee cada hoja solo cuando se accede a ella.
+
+    Cada libro se abre una sola vez y cada hoja se lee una sola vez: las claves
+    que usan la misma hoja reciben una copia de la lectura ya hecha, y las que
+    piden un subconjunto de columnas solo leen esas columnas si la hoja aún no
+    se ha leído completa.
+    """
+
+    def __init__(self, uploaded_files, hojas=HOJAS_DATOS):
+        self._archivos = uploaded_files
+        self._hojas = hojas
+        self._libros = {}
+        self._lecturas = {}
+        self._datos = {}
+        self._transformaciones = []
+
+    def _libro(self, archivo):
+        if archivo not in self._libros:
+            origen = self._archivos[archivo]
+            if is_results_store(origen):
+                self._libros[archivo] = origen
+            else:
+                self._libros[archivo] = pd.ExcelFile(origen, engine=resolve_engine())
+        return self._libros[archivo]
+
+    def abrir(self):
+        """
+        Abre todos los libros y comprueba que cada hoja exista y tenga las columnas
+        pedidas, para detectar de inmediato archivos, hojas o columnas faltantes.
+        """
+        for archivo, hoja, columnas in self._hojas.values():
+            libro = self._libro(archivo)
+            if isinstance(libro, pd.ExcelFile):
+                # Solo se leen los encabezados; falla si la hoja o las columnas no existen
+                libro.parse(hoja, usecols=columnas, nrows=0)
+            else:
+                disponibles = table_columns(libro, hoja)
+                faltantes = [columna for columna in columnas or [] if columna not in disponibles]
+                if faltantes:
+                    raise ValueError(f"La tabla '{hoja}' no tiene las columnas {faltantes}.")
+
+    def _leer(self, archivo, hoja, columnas):
+        lectura = self._lecturas.get((archivo, hoja))
+        if lectura is not None:
+            return (lectura[columnas] if columnas else lectura).copy()
+
+        libro = self._libro(archivo)
+        if isinstance(libro, pd.ExcelFile):
+            df = libro.parse(hoja, usecols=columnas)
+        else:
+            df = read_table(libro, hoja, columns=columnas)
+        if columnas is None:
+            self._lecturas[(archivo, hoja)] = df.copy()
+        return df
+
+    def agregar_transformacion(self, funcion):
+        """
+        Registra una función que se aplica a cada DataFrame al leerlo.
+
+        También se aplica a los DataFrames ya leídos.
+        """
+        self._transformaciones.append(funcion)
+        for clave, df in self._datos.items():
+            self._datos[clave] = funcion(df)
+
+    def __getitem__(self, clave):
+        if clave not in self._datos:
+            archivo, hoja, columnas = self._hojas[clave]
+            df = self._leer(archivo, hoja, columnas)
+            df = apply_schema(df, 'fileresultados' if hoja == 'Datos' else hoja)
+            if clave in CONVERSIONES:
+                df = CONVERSIONES[clave](df)
+            for funcion in self._transformaciones:
+                df = funcion(df)
+            self._datos[clave] = df
+        return self._datos[clave]
+
+    def __iter__(self):
+        return iter(self._hojas)
+
+    def __len__(self):
+        return len(self._hojas)
 
 
 def cargar_datos(uploaded_files):
-    try:
-        df_res_com = pd.read_excel(uploaded_files['resultados'], sheet_name='Datos')
-        combined_df_base_complet3 = pd.read_excel(uploaded_files['combined'], sheet_name='basecompleta')
-        summary_df = pd.read_excel(uploaded_files['combined'], sheet_name='Summary')
-        df_resultados_porcentaje = pd.read_excel(uploaded_files['combined'], sheet_name='resultado')
-        df_porcentajes_niveles = pd.read_excel(uploaded_files['combined'], sheet_name='df_porcentajes_niveles')
-        df_res_dimTE3 = pd.read_excel(uploaded_files['combined'], sheet_name='df_res_dimTE3')
-        df_resumen = pd.read_excel(uploaded_files['combined'], sheet_name='df_resumen')
-        top_glosas = pd.read_excel(uploaded_files['combined'], sheet_name='top_glosas')
-
-        df_rec = pd.read_excel(uploaded_files['recomendaciones'], sheet_name='Hoja1')
-        df_ciiu = pd.read_excel(uploaded_files['ciiu'], sheet_name='ciiu')
-
-        df_resultados = pd.read_excel(uploaded_files['resultados'], sheet_name='Datos', usecols=['CUV', 'Folio'])
-        df_res_com_resultados = pd.read_excel(uploaded_files['resultados'], sheet_name='Datos')
-        df_resultados['CUV'] = pd.to_numeric(df_resultados['CUV'], errors='coerce').astype('Int64')
+    """
+    Prepara los datos de la aplicación a partir de los archivos cargados.
 
+    Las hojas se leen recién cuando se accede a ellas (ver DatosCargados).
+
+    Parámetros:
+    - uploaded_files (dict): Archivos 'combined', 'resultados', 'recomendaciones' y 'ciiu'.
+      'combined' puede ser el archivo xlsx o la carpeta del almacén de resultados.
+
+    Retorna:
+    - DatosCargados: Diccionario de DataFrames, o None si algún archivo no se pudo abrir.
+    """
+    try:
+        datos = DatosCargados(uploaded_files)
+        datos.abrir()
         st.success("Todos los archivos se cargaron exitosamente.")
-        return {
-            'df_res_com': df_res_com,
-            'combined_df_base_complet3': combined_df_base_complet3,
-            'summary_df': summary_df,
-            'df_resultados_porcentaje': df_resultados_porcentaje,
-            'df_porcentajes_niveles': df_porcentajes_niveles,
-            'df_res_dimTE3': df_res_dimTE3,
-            'df_resumen': df_resumen,
-            'top_glosas': top_glosas,
-            'df_rec': df_rec,
-            'df_ciiu': df_ciiu,
-            'df_resultados': df_resultados,
-            'df_res_com_resultados': df_res_com_resultados
-        }
+        return datos
     except Exception as e:
         st.error(f"Error al cargar los datos: {e}")
         return None
@@ -76,9 +186,12 @@ def procesar_recomendaciones(df_rec, df_ciiu):
 
 
 def convertir_columnas(df_dict):
+    if isinstance(df_dict, DatosCargados):
+        # Se aplica a cada hoja al leerla, sin forzar la lectura de todas
+        df_dict.agregar_transformacion(_cuv_a_texto)
+        return df_dict
     for key, df in df_dict.items():
-        if 'CUV' in df.columns:
-            df['CUV'] = df['CUV'].astype(str)
+        _cuv_a_texto(df)
     return df_dict
 
 
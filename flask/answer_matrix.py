@@ -0,0 +1,125 @@
+# answer_matrix.py
+
+import numpy as np
+import pandas as pd
+
+# Código de respuesta vacía en la matriz (las respuestas válidas van de 0 a 5)
+MISSING = 255
+
+# Filas por bloque al multiplicar, para no convertir toda la matriz a float32 de una vez
+BLOCK_ROWS = 65536
+
+
+class AnswerMatrix:
+    """
+    Respuestas CEAL como una matriz uint8 de personas x preguntas, más sus datos de fila.
+
+    Ocupa un byte por respuesta (en lugar de ocho de una columna float64) y las
+    respuestas vacías se guardan como MISSING.
+
+    Parámetros:
+    values (np.ndarray): Matriz uint8 de forma (personas, preguntas).
+    questions (list): Codpreg de cada columna de values.
+    rows (pd.DataFrame): Datos de cada fila (CUV, CdT, TE3, ...), con el índice original.
+    """
+
+    def __init__(self, values, questions, rows):
+        self.values = values
+        self.questions = list(questions)
+        self.rows = rows
+        self.column_index = {question: j for j, question in enumerate(self.questions)}
+
+    @classmethod
+    def from_frame(cls, df, questions, row_columns=()):
+        """
+        Construye la matriz a partir de respuestas ya validadas (ver validate_answers).
+
+        Parámetros:
+        df (pd.DataFrame): Respuestas.
+        questions (list): Columnas de preguntas, en el orden de la matriz.
+        row_columns (list): Columnas de df que se conservan como datos de fila.
+
+        Retorna:
+        AnswerMatrix: Matriz de respuestas.
+        """
+        values = np.full((len(df), len(questions)), MISSING, dtype='uint8')
+        for j, question in enumerate(questions):
+            column = df[question].to_numpy(dtype='float64', na_value=np.nan)
+            answered = ~np.isnan(column)
+            if ((column[answered] < 0) | (column[answered] >= MISSING) | (column[answered] % 1 != 0)).any():
+                raise ValueError(f"La pregunta '{question}' tiene respuestas que no son enteros entre 0 y {MISSING - 1}.")
+            values[answered, j] = column[answered]
+        return cls(values, questions, df[list(row_columns)].copy())
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def missing(self):
+        """
+        Retorna la máscara de respuestas vacías, de forma (personas, preguntas).
+        """
+        return self.values == MISSING
+
+    def column(self, question):
+        """
+        Retorna las respuestas de una pregunta como float64, con NaN en las vacías.
+        """
+        values = self.values[:, self.column_index[question]]
+        return np.where(values == MISSING, np.nan, values)
+
+    def to_frame(self):
+        """
+        Retorna las respuestas como DataFrame float64 (NaN en las vacías), con el índice de rows.
+        """
+        values = np.where(self.values == MISSING, np.nan, self.values)
+        return pd.DataFrame(values, index=self.rows.index, columns=self.questions)
+
+
+def incidence_matrix(questions, coddim_to_codpreg):
+    """
+    Matriz de incidencia pregunta -> dimensión: 1 si la pregunta suma al puntaje de la dimensión.
+
+    Parámetros:
+    questions (list): Codpreg de las columnas de la matriz de respuestas.
+    coddim_to_codpreg (dict): {Coddim: lista de Codpreg}.
+
+    Retorna:
+    np.ndarray: Matriz float32 de forma (preguntas, dimensiones), en el orden de coddim_to_codpreg.
+    """
+    column_index = {question: j for j, question in enumerate(questions)}
+    incidence = np.zeros((len(questions), len(coddim_to_codpreg)), dtype='float32')
+    for k, codpreg_list in enumerate(coddim_to_codpreg.values()):
+        incidence[[column_index[codpreg] for codpreg in codpreg_list], k] = 1
+    return incidence
+
+
+def dimension_scores(answers, coddim_to_codpreg, incidence=None):
+    """
+    Calcula el subtotal de todas las dimensiones con una sola multiplicación de matrices.
+
+    Las respuestas vacías suman 0, igual que df[codpreg_list].sum(axis=1). Un subtotal
+    es entero si ninguna de sus preguntas tiene respuestas vacías, y float64 si alguna
+    tiene, como la suma sobre las columnas validadas.
+
+    Parámetros:
+    answers (AnswerMatrix): Matriz de respuestas.
+    coddim_to_codpreg (dict): {Coddim: lista de Codpreg}; todas las preguntas deben estar en la matriz.
+    incidence (np.ndarray, opcional): Matriz de incidencia ya calculada para answers.questions
+                                      y coddim_to_codpreg (por ejemplo CATALOG.incidence).
+
+    Retorna:
+    pd.DataFrame: Una columna de subtotal por Coddim, con el índice de answers.rows.
+    """
+    if incidence is None:
+        incidence = incidence_matrix(answers.questions, coddim_to_codpreg)
+    scores = np.empty((len(answers), incidence.shape[1]), dtype='float32')
+    for start in range(0, len(answers), BLOCK_ROWS):
+        block = answers.values[start:start + BLOCK_ROWS]
+        # float32 representa exactamente estas sumas de enteros pequeños
+        scores[start:start + BLOCK_ROWS] = np.where(block == MISSING, 0, block).astype('float32') @ incidence
+    has_missing = (answers.missing().any(axis=0).astype('float32') @ incidence) > 0
+
+    result = pd.DataFrame(scores.astype('float64'), index=answers.rows.index, columns=list(coddim_to_codpreg))
+    for coddim in result.columns[~has_missing]:
+        result[coddim] = result[coddim].astype('int64')
+    return result
@@ -2,6 +2,9 @@ from flask import Flask, render_template, request, redirect, url_for
 import pyodbc
 from datetime import datetime
 
+# Se ejecuta con la carpeta flask/ en sys.path (aquí 'flask' es el paquete Flask)
+from db_pool import ConnectionPool
+
 app = Flask(__name__)
 
 # Configuración de la base de datos para SQL Server
@@ -18,6 +21,10 @@ def get_db_connection():
     )
 
 
+# Pool de conexiones del proceso: cada solicitud reutiliza una conexión abierta
+pool = ConnectionPool(get_db_connection)
+
+
 @app.route('/')
 def formulario():
     return render_template('formulario.html')
@@ -30,10 +37,6 @@ def enviar():
         email = request.form['email']
 
         try:
-            # Establecer la conexión con SQL Server
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
             # Definir los campos de destino en la tabla de SQL Server
             campos_destino = ['nombre', 'email', 'created_at', 'updated_at']
 
@@ -50,13 +53,12 @@ def enviar():
             print(f"Consulta: {consulta_insercion}")
             print(f"Valores a insertar: {valores}")
 
-            # Ejecutar la consulta
-            cursor.execute(consulta_insercion, valores)
-            conn.commit()
-
-            # Cerrar cursor y conexión
-            cursor.close()
-            conn.close()
+            # Ejecutar la consulta con una conexión del pool (se devuelve al pool al salir del bloque)
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(consulta_insercion, valores)
+                conn.commit()
+                cursor.close()
 
             return redirect(url_for('formulario'))
 
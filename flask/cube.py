@@ -0,0 +1,182 @@
+# cube.py
+
+import numpy as np
+import pandas as pd
+
+from flask.percentages import percentage_table
+
+# Dimensiones del cubo, además de Dimensión y Nivel
+CUBE_KEYS = ['CUV', 'TE3', 'Genero', 'Rango Edad']
+
+
+class LevelCube:
+    """
+    Cubo de conteos de respuestas por CUV, TE3, Genero, Rango Edad, Dimensión y Nivel.
+
+    Se calcula una vez sobre las respuestas; cualquier corte (por CUV, por GES o por
+    datos demográficos) se obtiene sumando celdas del cubo, sin volver a recorrer las
+    respuestas. Solo se guardan las celdas con respuestas, con claves categóricas y
+    conteos int32.
+
+    Parámetros:
+    levels (pd.DataFrame): Columnas CUBE_KEYS, Dimensión, Nivel y Respuestas.
+    cells (pd.DataFrame): Columnas CUBE_KEYS, Filas (respuestas de la celda) y CdT.
+    """
+
+    def __init__(self, levels, cells):
+        self.levels = levels
+        self.cells = cells
+        self.keys = [col for col in cells.columns if col not in ('Filas', 'CdT')]
+
+    @classmethod
+    def from_responses(cls, df, risk_columns, keys=CUBE_KEYS, cdt_column='CdT'):
+        """
+        Construye el cubo con un conteo vectorizado (np.bincount) por dimensión.
+
+        Las respuestas con claves vacías se conservan en su propia celda, de modo que
+        los cortes por CUV incluyen a todas las personas.
+
+        Parámetros:
+        df (pd.DataFrame): Respuestas con una columna de nivel de riesgo por dimensión.
+        risk_columns (dict): {columna de nivel de riesgo: dimensión}.
+        keys (list): Dimensiones del cubo.
+        cdt_column (str, opcional): Columna de centro de trabajo que se guarda por celda.
+
+        Retorna:
+        LevelCube: Cubo de conteos.
+        """
+        keys = list(keys)
+        grouped = df.groupby(keys, dropna=False, observed=True, sort=True)
+        cell_ids = grouped.ngroup().to_numpy()
+        cells = grouped.size().rename('Filas').astype('int32')
+        if cdt_column:
+            cells = pd.concat([cells, grouped[cdt_column].first().rename('CdT')], axis=1)
+        cells = cells.reset_index()
+        n_cells = len(cells)
+
+        frames = []
+        for column, dimension in risk_columns.items():
+            codes, uniques = pd.factorize(df[column], sort=True)
+            answered = codes >= 0
+            counts = np.bincount(cell_ids[answered] * len(uniques) + codes[answered],
+                                 minlength=n_cells * len(uniques)).reshape(n_cells, len(uniques))
+            cell_index, level_index = np.nonzero(counts)
+            frames.append(pd.DataFrame({
+                'celda': cell_index,
+                'Dimensión': dimension,
+                'Nivel': np.asarray(uniques, dtype=object)[level_index],
+                'Respuestas': counts[cell_index, level_index].astype('int32'),
+            }))
+
+        levels = pd.concat(frames, ignore_index=True) if frames else \
+            pd.DataFrame(columns=['celda', 'Dimensión', 'Nivel', 'Respuestas'])
+        levels = pd.concat([cells[keys].iloc[levels['celda'].to_numpy()].reset_index(drop=True),
+                            levels.drop(columns='celda')], axis=1)
+        for col in ['Dimensión', 'Nivel'] + [key for key in keys if not pd.api.types.is_numeric_dtype(levels[key])]:
+            levels[col] = levels[col].astype('category')
+        return cls(levels, cells)
+
+    @classmethod
+    def from_tables(cls, tables):
+        """
+        Reconstruye el cubo a partir de las tablas de to_tables (por ejemplo, leídas del almacén de resultados).
+
+        Parámetros:
+        tables (dict): {'cubo_niveles': DataFrame, 'cubo_celdas': DataFrame}.
+
+        Retorna:
+        LevelCube: Cubo de conteos.
+        """
+        levels = tables['cubo_niveles'].copy()
+        cells = tables['cubo_celdas'].copy()
+        # Los conteos ya vienen como enteros; la conversión solo protege ante tablas
+        # exportadas con otros tipos (por ejemplo, texto o decimales)
+        levels['Respuestas'] = pd.to_numeric(levels['Respuestas']).astype('int32')
+        cells['Filas'] = pd.to_numeric(cells['Filas']).astype('int32')
+        return cls(levels, cells)
+
+    def to_tables(self):
+        """
+        Retorna el cubo como tablas planas para el almacén de resultados.
+
+        Retorna:
+        dict: {'cubo_niveles': DataFrame, 'cubo_celdas': DataFrame}.
+        """
+        levels = self.levels.copy()
+        for col in levels.columns:
+            if isinstance(levels[col].dtype, pd.CategoricalDtype):
+                levels[col] = levels[col].astype(object)
+        return {'cubo_niveles': levels, 'cubo_celdas': self.cells.copy()}
+
+    def _select(self, table, filters):
+        if not filters:
+            return table
+        mask = np.ones(len(table), dtype=bool)
+        for col, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= table[col].isin(values).to_numpy()
+        return table[mask]
+
+    def counts(self, keys, filters=None):
+        """
+        Suma el cubo sobre las dimensiones que no están en keys.
+
+        Parámetros:
+        keys (list): Dimensiones del corte, por ejemplo ['CUV'] o ['CUV', 'Genero'].
+        filters (dict, opcional): {dimensión: valor o lista de valores} a conservar.
+
+        Retorna:
+        pd.Series: Respuestas indexadas por keys + ['Dimensión', 'Nivel'].
+        """
+        columns = list(keys) + ['Dimensión', 'Nivel']
+        counts = self._select(self.levels, filters).groupby(columns, observed=True)['Respuestas'].sum().reset_index()
+        # Valores simples en el índice, como los conteos calculados sobre las respuestas
+        for col in columns:
+            if isinstance(counts[col].dtype, pd.CategoricalDtype):
+                counts[col] = counts[col].astype(counts[col].cat.categories.dtype)
+        return counts.set_index(columns)['Respuestas']
+
+    def totals(self, keys, filters=None, denominator='rows'):
+        """
+        Denominador de los porcentajes de un corte.
+
+        Parámetros:
+        keys (list): Dimensiones del corte.
+        filters (dict, opcional): {dimensión: valor o lista de valores} a conservar.
+        denominator (str): 'rows' (personas del grupo) o 'answered' (personas con nivel
+                           de riesgo en cada dimensión).
+
+        Retorna:
+        pd.Series: Indexada por keys ('rows') o por keys + ['Dimensión'] ('answered').
+        """
+        keys = list(keys)
+        if denominator == 'rows':
+            return self._select(self.cells, filters).groupby(keys, observed=True)['Filas'].sum()
+        if denominator == 'answered':
+            return self.counts(keys, filters).groupby(level=keys + ['Dimensión'], observed=True).sum()
+        raise ValueError(f"Denominador no válido: {denominator}")
+
+    def percentages(self, keys, filters=None, denominator='rows', dimensions=None):
+        """
+        Tabla de porcentajes por nivel de riesgo de un corte del cubo.
+
+        Con keys=['CUV'] o ['CUV', 'TE3'] es la misma tabla que risk_level_percentages
+        sobre las respuestas; también admite cortes por Genero y Rango Edad.
+
+        Parámetros:
+        keys (list): Dimensiones del corte; la primera debe ser 'CUV' para agregar CdT.
+        filters (dict, opcional): {dimensión: valor o lista de valores} a conservar.
+        denominator (str): 'rows' o 'answered' (ver totals).
+        dimensions (list, opcional): Dimensiones de salida, en orden. Por defecto, las del cubo.
+
+        Retorna:
+        pd.DataFrame: Tabla con el esquema de percentage_table.
+        """
+        keys = list(keys)
+        if dimensions is None:
+            dimensions = list(self.levels['Dimensión'].astype(object).drop_duplicates())
+        first_cdt = None
+        if 'CdT' in self.cells.columns and keys[0] == 'CUV':
+            first_cdt = self._select(self.cells, filters).dropna(subset=keys).groupby(keys, observed=True)['CdT'].first()
+        return percentage_table(self.counts(keys, filters), self.totals(keys, filters, denominator),
+                                dimensions, keys, first_cdt)
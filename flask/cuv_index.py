@@ -0,0 +1,106 @@
+# cuv_index.py
+
+import json
+import logging
+import os
+
+from flask.data_loading import extract_rut_cuv
+
+
+class CuvIndex:
+    """
+    Índice persistente de la carpeta de tablas: archivo -> CUV, RUT, CdT y mtime.
+
+    Se actualiza de forma incremental: solo se analizan los nombres de los
+    archivos nuevos o modificados desde la última actualización. Permite
+    cargar únicamente los archivos de un conjunto de CUV o RUT.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.entries = {}
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"No se pudo leer el índice {index_path}; se reconstruirá: {e}")
+
+    def update(self, folder_path):
+        """
+        Actualiza el índice con el contenido actual de la carpeta y lo guarda.
+
+        Parámetros:
+        folder_path (str): Carpeta que contiene los archivos Excel.
+
+        Retorna:
+        CuvIndex: El mismo índice, para encadenar llamadas.
+        """
+        entries = {}
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                if not entry.name.endswith('.xlsx') or not entry.is_file():
+                    continue
+                mtime = entry.stat().st_mtime
+                known = self.entries.get(entry.name)
+                if known is not None and known['mtime'] == mtime:
+                    entries[entry.name] = known
+                    continue
+                rut, cuv, cdtm = extract_rut_cuv(entry.name)
+                entries[entry.name] = {
+                    'path': entry.path,
+                    'cuv': cuv,
+                    'rut': rut,
+                    'cdt_glosa': cdtm,
+                    'mtime': mtime,
+                }
+
+        logging.info(f"Índice de CUV actualizado: {len(entries)} archivos "
+                     f"({len(set(entries) - set(self.entries))} nuevos).")
+        self.entries = entries
+        self.save()
+        return self
+
+    def save(self):
+        """Escribe el índice en disco."""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def by_cuv(self):
+        """
+        Retorna el mapeo CUV -> lista de nombres de archivo.
+
+        Retorna:
+        dict: {cuv: [archivo, ...]}
+        """
+        mapping = {}
+        for file_name, entry in self.entries.items():
+            if entry['cuv']:
+                mapping.setdefault(entry['cuv'], []).append(file_name)
+        return mapping
+
+    def files(self, cuvs=None, ruts=None):
+        """
+        Selecciona los archivos de los CUV y/o RUT indicados.
+
+        Parámetros:
+        cuvs (iterable, opcional): CUV a seleccionar. None no filtra; una lista vacía no selecciona nada.
+        ruts (iterable, opcional): RUT de empleador a seleccionar. None no filtra; una lista vacía no selecciona nada.
+
+        Retorna:
+        list: Nombres de archivo ordenados alfabéticamente.
+        """
+        cuvs = {str(cuv) for cuv in cuvs} if cuvs is not None else None
+        ruts = {str(rut).upper() for rut in ruts} if ruts is not None else None
+        if cuvs == set() or ruts == set():
+            return []
+        selected = []
+        for file_name, entry in self.entries.items():
+            if cuvs is not None and entry['cuv'] not in cuvs:
+                continue
+            if ruts is not None and (entry['rut'] or '').upper() not in ruts:
+                continue
+            selected.append(file_name)
+        return sorted(selected)
@@ -1,13 +1,27 @@
 # data_loading.py
 
+import hashlib
+import inspect
 import os
 import pandas as pd
 import re
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from flask import excel_readers, schema
+from flask.excel_readers import read_sheet
+from flask.ingest_manifest import IngestManifest
+from flask.schema import apply_schema
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Expresiones regulares para extraer RUT, CUV y CDT del nombre de archivo
+RUT_PATTERN = re.compile(r'\d{8}-[\dkK]')
+CUV_PATTERN = re.compile(r'(\d+)(?=\.xlsx)')
+CDT_PATTERN = re.compile(r'\d{8}-[\dkK]-(.*?)-\d+\.xlsx')
+
 def rename_duplicate_columns(df):
     """
     Renombra columnas duplicadas en un DataFrame agregando un sufijo numérico.
@@ -41,10 +55,9 @@ def extract_rut_cuv(file_name):
     Retorna:
     tuple: (rut, cuv, cdtm) si se encontraron, de lo contrario, (None, None, None).
     """
-    # Expresiones regulares para extraer RUT, CUV y CDT
-    rut_match = re.search(r'\d{8}-[\dkK]', file_name)
-    cuv_match = re.search(r'(\d+)(?=\.xlsx)', file_name)
-    cdt_match = re.search(r'\d{8}-[\dkK]-(.*?)-\d+\.xlsx', file_name)
+    rut_match = RUT_PATTERN.search(file_name)
+    cuv_match = CUV_PATTERN.search(file_name)
+    cdt_match = CDT_PATTERN.search(file_name)
 
     if rut_match and cuv_match and cdt_match:
         rut = rut_match.group(0)
@@ -55,55 +68,126 @@ def extract_rut_cuv(file_name):
         logging.warning(f"No se pudo extraer RUT o CUV del archivo: {file_name}")
         return None, None, None
 
-def load_excel_files(folder_path):
+def load_excel_file(folder_path, file_name):
+    """
+    Carga la hoja 'BaseCompleta' de un archivo Excel y agrega RUT, CUV y CDT.
+
+    Parámetros:
+    folder_path (str): Ruta de la carpeta que contiene el archivo.
+    file_name (str): Nombre del archivo Excel.
+
+    Retorna:
+    pd.DataFrame: DataFrame del archivo, o None si ocurrió un error al procesarlo.
+    """
+    file_path = os.path.join(folder_path, file_name)
+    logging.info(f"Procesando archivo: {file_name}")
+
+    try:
+        # Leer la hoja "BaseCompleta"
+        df = read_sheet(file_path, sheet_name='BaseCompleta', header=1, usecols='C:CO')
+        df = rename_duplicate_columns(df)
+        df.rename(columns={'DD1': 'Genero', 'DD2': 'Edad'}, inplace=True)
+        df['Genero'] = df['Genero'].replace({1: 'Hombre', 2: 'Mujer', 3: 'NcOtro', 4: 'NcOtro'})
+
+        # Extraer RUT y CUV del nombre del archivo
+        rut, cuv, cdtm = extract_rut_cuv(file_name)
+        if rut and cuv and cdtm:
+            df['RUT_empleador'] = rut
+            df['CUV'] = cuv
+            df['CDT_glosa'] = cdtm
+        else:
+            logging.warning(f"No se pudo extraer RUT o CUV del archivo: {file_name}")
+
+        return df
+
+    except Exception as e:
+        logging.error(f"Error procesando el archivo {file_name}: {e}")
+        return None
+
+def load_excel_files(folder_path, workers=1, cache_dir=None, file_names=None):
     """
     Carga y combina archivos Excel desde una carpeta específica.
 
+    Con workers > 1 los archivos se reparten en un pool de procesos. Los
+    resultados se combinan siempre en orden alfabético de nombre de archivo,
+    de modo que la salida es la misma en modo secuencial y paralelo.
+
+    Si se indica cache_dir, los archivos sin cambios desde la última carga se
+    leen desde la caché Parquet del manifiesto y solo se procesan los nuevos
+    o modificados.
+
+    Con file_names se cargan solo esos archivos (por ejemplo, los de un
+    conjunto de CUV obtenidos de CuvIndex.files).
+
     Parámetros:
     folder_path (str): Ruta de la carpeta que contiene los archivos Excel.
+    workers (int): Número de procesos a utilizar (1 = secuencial).
+    cache_dir (str, opcional): Carpeta del manifiesto y la caché de ingesta.
+    file_names (list, opcional): Archivos a cargar. Por defecto, todos los .xlsx de la carpeta.
 
     Retorna:
     pd.DataFrame: DataFrame combinado de todos los archivos.
     """
     # Obtener lista de archivos .xlsx en la carpeta
-    file_list = [f for f in os.listdir(folder_path) if f.endswith('.xlsx')]
-
-    data_frames = []
-
-    for file_name in file_list:
-        file_path = os.path.join(folder_path, file_name)
-        logging.info(f"Procesando archivo: {file_name}")
-
-        try:
-            # Leer la hoja "BaseCompleta"
-            df = pd.read_excel(file_path, sheet_name='BaseCompleta', header=1, usecols='C:CO')
-            df = rename_duplicate_columns(df)
-            df.rename(columns={'DD1': 'Genero', 'DD2': 'Edad'}, inplace=True)
-            df['Genero'] = df['Genero'].replace({1: 'Hombre', 2: 'Mujer', 3: 'NcOtro', 4: 'NcOtro'})
+    if file_names is None:
+        file_names = [f for f in os.listdir(folder_path) if f.endswith('.xlsx')]
+    file_list = sorted(file_names)
+
+    manifest = IngestManifest(cache_dir, version=loader_version()) if cache_dir else None
+    cached = {}
+    if manifest is not None:
+        for file_name in file_list:
+            df = manifest.load(folder_path, file_name)
+            if df is not None:
+                cached[file_name] = df
+        logging.info(f"{len(cached)} archivos cargados desde caché.")
+
+    pending = [f for f in file_list if f not in cached]
+
+    if workers and workers > 1 and len(pending) > 1:
+        logging.info(f"Cargando {len(pending)} archivos con {workers} procesos...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map conserva el orden de pending
+            results = list(executor.map(load_excel_file, repeat(folder_path), pending,
+                                        chunksize=max(1, len(pending) // (workers * 4))))
+    else:
+        results = [load_excel_file(folder_path, file_name) for file_name in pending]
 
-            # Extraer RUT y CUV del nombre del archivo
-            rut, cuv, cdtm = extract_rut_cuv(file_name)
-            if rut and cuv and cdtm:
-                df['RUT_empleador'] = rut
-                df['CUV'] = cuv
-                df['CDT_glosa'] = cdtm
-            else:
-                logging.warning(f"No se pudo extraer RUT o CUV del archivo: {file_name}")
+    parsed = dict(zip(pending, results))
 
-            data_frames.append(df)
+    if manifest is not None:
+        for file_name, df in parsed.items():
+            if df is not None:
+                manifest.store(folder_path, file_name, df)
+        manifest.save()
 
-        except Exception as e:
-            logging.error(f"Error procesando el archivo {file_name}: {e}")
+    data_frames = [cached[f] if f in cached else parsed[f] for f in file_list]
+    data_frames = [df for df in data_frames if df is not None]
 
     if data_frames:
         # Combinar todos los DataFrames
         combined_df = pd.concat(data_frames, ignore_index=True)
+        combined_df = apply_schema(combined_df, 'basecompleta')
         logging.info("Archivos combinados exitosamente.")
         return combined_df
     else:
         logging.warning("No se encontraron DataFrames para combinar.")
         return pd.DataFrame()  # Retorna un DataFrame vacío si no hay datos
 
+def loader_version():
+    """
+    Versión del cargador de archivos para la caché de ingesta: hash del código de
+    load_excel_file, de las funciones que usa y de los módulos de lectura y esquema.
+    Si cambia alguno, los archivos en caché se vuelven a leer.
+
+    Retorna:
+    str: Hash hexadecimal.
+    """
+    digest = hashlib.sha256()
+    for obj in [load_excel_file, rename_duplicate_columns, extract_rut_cuv, excel_readers, schema]:
+        digest.update(inspect.getsource(obj).encode('utf-8'))
+    return digest.hexdigest()
+
 def create_age_range(df):
     """
     Crea una nueva columna 'Rango Edad' en el DataFrame basado en la edad.
@@ -0,0 +1,48 @@
+# db.py
+
+import logging
+import threading
+
+import pyodbc
+
+from flask import config
+from flask.db_pool import ConnectionPool
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_db_connection():
+    """
+    Establece una conexión con la base de datos SQL Server.
+
+    Retorna:
+    pyodbc.Connection: Conexión abierta, o None si no se pudo conectar.
+    """
+    try:
+        connection = pyodbc.connect(
+            f'DRIVER={config.DB_DRIVER};'
+            f'SERVER={config.DB_SERVER};'
+            f'DATABASE={config.DB_DATABASE};'
+            f'UID={config.DB_USERNAME};'
+            f'PWD={config.DB_PASSWORD}'
+        )
+        return connection
+    except pyodbc.Error as e:
+        logging.error(f"Error al conectar a la base de datos: {e}")
+        return None
+
+
+def get_pool():
+    """
+    Retorna el pool de conexiones del proceso, creándolo en la primera llamada.
+
+    Retorna:
+    ConnectionPool: Pool compartido (ver config.DB_POOL_SIZE y config.DB_POOL_IDLE_TIMEOUT).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(get_db_connection, size=config.DB_POOL_SIZE,
+                                   idle_timeout=config.DB_POOL_IDLE_TIMEOUT)
+        return _pool
@@ -0,0 +1,139 @@
+# db_pool.py
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+# Este módulo no importa nada de flask/, para poder usarlo también desde flask/app.py
+# (que se ejecuta con la carpeta flask/ en sys.path).
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones pyodbc compartido por todo el proceso.
+
+    Las conexiones se abren solo cuando se necesitan (a lo más `size` a la vez) y se
+    reutilizan entre consultas, de modo que el inicio de sesión en SQL Server se paga
+    una vez por conexión y no una vez por consulta. Las conexiones que llevan más de
+    `idle_timeout` segundos sin usarse se cierran, y las que llevan más de
+    `check_after` segundos se validan con `SELECT 1` antes de entregarlas.
+
+    Parámetros:
+    connect (callable): Función sin argumentos que abre una conexión nueva.
+    size (int): Número máximo de conexiones abiertas.
+    idle_timeout (float): Segundos sin uso tras los que una conexión se cierra.
+    check_after (float): Segundos sin uso tras los que una conexión se valida antes de reutilizarla.
+    wait_timeout (float, opcional): Segundos máximos de espera por una conexión libre (None = sin límite).
+    """
+
+    def __init__(self, connect, size=5, idle_timeout=300, check_after=30, wait_timeout=60):
+        self._connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.check_after = check_after
+        self.wait_timeout = wait_timeout
+        # LIFO: se reutiliza la conexión usada más recientemente y las demás pueden expirar
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception as e:
+            logging.warning(f"Error al cerrar una conexión del pool: {e}")
+
+    @staticmethod
+    def _is_healthy(connection):
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception as e:
+            logging.warning(f"Conexión del pool descartada: {e}")
+            return False
+
+    def _take_idle(self):
+        # Primera conexión libre que siga en buen estado, o None si no hay
+        while True:
+            try:
+                connection, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            idle = time.monotonic() - last_used
+            if idle > self.idle_timeout:
+                self._close(connection)
+            elif idle <= self.check_after or self._is_healthy(connection):
+                return connection
+            else:
+                self._close(connection)
+
+    def acquire(self):
+        """
+        Entrega una conexión del pool, abriendo una nueva si no hay conexiones libres.
+
+        Retorna:
+        pyodbc.Connection: Conexión abierta; debe devolverse con release.
+        """
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise TimeoutError(f"No hay conexiones libres en el pool después de {self.wait_timeout} s.")
+        try:
+            connection = self._take_idle()
+            if connection is None:
+                connection = self._connect()
+                if connection is None:
+                    raise ConnectionError("No se pudo abrir una conexión a la base de datos.")
+                logging.info("Conexión nueva abierta en el pool.")
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        """
+        Devuelve una conexión al pool. Las transacciones sin confirmar se revierten.
+
+        Parámetros:
+        connection (pyodbc.Connection): Conexión entregada por acquire.
+        discard (bool): Si es True, la conexión se cierra en lugar de reutilizarse.
+        """
+        try:
+            if not discard:
+                try:
+                    connection.rollback()
+                except Exception:
+                    discard = True
+            if discard:
+                self._close(connection)
+            else:
+                self._idle.put((connection, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Conexión del pool para un bloque `with`; se devuelve al pool al salir del bloque.
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """
+        Cierra las conexiones libres del pool (por ejemplo, al terminar el proceso).
+        """
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(connection)
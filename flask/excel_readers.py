@@ -0,0 +1,52 @@
+# excel_readers.py
+
+import importlib.util
+import logging
+
+import pandas as pd
+
+from flask import config
+
+# Motores soportados, en orden de preferencia
+ENGINES = ('calamine', 'openpyxl')
+
+
+def resolve_engine(engine=None):
+    """
+    Determina el motor de lectura a utilizar.
+
+    Si no se indica un motor se usa config.EXCEL_ENGINE. Si el motor 'calamine'
+    no está instalado (paquete python-calamine) se recurre a 'openpyxl'.
+
+    Parámetros:
+    engine (str, opcional): 'calamine' u 'openpyxl'.
+
+    Retorna:
+    str: Nombre del motor a utilizar.
+    """
+    engine = engine or config.EXCEL_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Motor de lectura Excel no soportado: {engine}")
+    if engine == 'calamine' and importlib.util.find_spec('python_calamine') is None:
+        logging.warning("python-calamine no está instalado; se utilizará openpyxl.")
+        return 'openpyxl'
+    return engine
+
+
+def read_sheet(path, sheet_name=0, header=0, usecols=None, engine=None):
+    """
+    Lee una o varias hojas de un archivo Excel con el motor configurado.
+
+    Parámetros:
+    path (str | file-like): Ruta o archivo Excel.
+    sheet_name (str | int | list | None): Hoja(s) a leer, igual que en pd.read_excel.
+    header (int): Fila que contiene los encabezados.
+    usecols (str | list, opcional): Columnas a leer, igual que en pd.read_excel.
+    engine (str, opcional): Motor de lectura; por defecto config.EXCEL_ENGINE.
+
+    Retorna:
+    pd.DataFrame | dict: DataFrame de la hoja, o diccionario de DataFrames si se piden varias.
+    """
+    return pd.read_excel(path, sheet_name=sheet_name, header=header, usecols=usecols,
+                         engine=resolve_engine(engine))
+
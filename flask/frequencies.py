@@ -0,0 +1,66 @@
+# frequencies.py
+
+import numpy as np
+import pandas as pd
+
+from flask.answer_matrix import MISSING
+
+
+def answer_frequencies(df, question_columns, keys, answers=None):
+    """
+    Cuenta la frecuencia de cada valor de respuesta por grupo y pregunta.
+
+    Cada pregunta se cuenta con un único np.bincount sobre (grupo, valor), sin
+    recorrer los grupos en Python. Solo se informan los valores presentes; las
+    respuestas vacías no se cuentan.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas.
+    question_columns (list): Columnas de preguntas, en el orden de salida.
+    keys (list): Columnas de agrupación, por ejemplo ['CUV', 'CdT'].
+    answers (AnswerMatrix, opcional): Matriz de respuestas alineada con df; si se indica,
+                                      los valores se leen de ella (un byte por respuesta)
+                                      y se cuentan sin ordenarlos.
+
+    Retorna:
+    pd.DataFrame: Columnas keys + ['Codpreg', 'valor', 'frec'], ordenadas por grupo,
+                  pregunta y valor.
+    """
+    grouped = df.groupby(keys, observed=True, sort=True)
+    group_ids = grouped.ngroup()
+    in_group = group_ids.notna().to_numpy()
+    group_ids = group_ids.fillna(-1).to_numpy(dtype='int64')
+    groups = grouped.size().index.to_frame(index=False)
+    n_groups = len(groups)
+
+    frames = []
+    for col in question_columns:
+        if answers is not None:
+            codes = answers.values[:, answers.column_index[col]]
+            mask = in_group & (codes != MISSING)
+            uniques, codes = np.arange(MISSING, dtype='float64'), codes[mask]
+        else:
+            values = df[col].to_numpy(dtype='float64', na_value=np.nan)
+            mask = in_group & ~np.isnan(values)
+            uniques, codes = np.unique(values[mask], return_inverse=True)
+        counts = np.bincount(group_ids[mask] * len(uniques) + codes, minlength=n_groups * len(uniques))
+        group_index, value_index = np.nonzero(counts.reshape(n_groups, len(uniques)))
+        frames.append(pd.DataFrame({
+            'grupo': group_index,
+            'Codpreg': col,
+            'valor': uniques[value_index],
+            'frec': counts.reshape(n_groups, len(uniques))[group_index, value_index],
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=keys + ['Codpreg', 'valor', 'frec'])
+    freq = pd.concat(frames, ignore_index=True).sort_values('grupo', kind='stable', ignore_index=True)
+    if all(pd.api.types.is_integer_dtype(df[col]) for col in question_columns):
+        freq['valor'] = freq['valor'].astype('int64')
+
+    result = groups.iloc[freq['grupo'].to_numpy()].reset_index(drop=True)
+    result[['Codpreg', 'valor', 'frec']] = freq[['Codpreg', 'valor', 'frec']]
+    for key in keys:
+        if isinstance(result[key].dtype, pd.CategoricalDtype):
+            result[key] = result[key].astype(object)
+    return result
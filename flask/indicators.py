@@ -0,0 +1,187 @@
+# indicators.py
+
+import numpy as np
+import pandas as pd
+
+# Indicadores derivados. Cada indicador se calcula a partir de su columna de origen
+# (o lista de columnas) con una regla de REGLAS, en el orden en que están definidos,
+# de modo que un indicador puede usar otro calculado antes.
+
+# Exposición a violencia: 1 si la respuesta es distinta de 0 (una respuesta vacía cuenta como exposición)
+VIOLENCIA = [
+    {"Codpreg": "CQ1_01", "Origen": "CQ1", "Regla": "distinto_de_0", "Temática": "Disputas o conflictos"},
+    {"Codpreg": "UT1_01", "Origen": "UT1", "Regla": "distinto_de_0", "Temática": "Bromas desagradables"},
+    {"Codpreg": "HSM1_01", "Origen": "HSM1", "Regla": "distinto_de_0", "Temática": "Acoso virtual"},
+    {"Codpreg": "SH1_01", "Origen": "SH1", "Regla": "distinto_de_0", "Temática": "Acoso sexual"},
+    {"Codpreg": "PV1_01", "Origen": "PV1", "Regla": "distinto_de_0", "Temática": "Violencia física"},
+    {"Codpreg": "AL_01", "Origen": "AL", "Regla": "distinto_de_0", "Temática": "Bullying o acoso"},
+    {"Codpreg": "HO_01", "Origen": "HO", "Regla": "distinto_de_0", "Temática": "Humillaciones"},
+    {"Codpreg": "Expo_total", "Origen": ["CQ1_01", "UT1_01", "HSM1_01", "SH1_01", "PV1_01", "AL_01", "HO_01"],
+     "Regla": "suma", "Temática": None},
+    {"Codpreg": "Expo_total_01", "Origen": "Expo_total", "Regla": "distinto_de_0", "Temática": "Exposicion a violencia"},
+]
+
+# Factores protectores: numerador '_n' (respuestas 0 o 1; vacío si respondió 5, "no aplica")
+# y denominador '_d' (respuestas válidas de 0 a 4)
+PROTECTORES = [
+    {"Codpreg": f"{col}_{tipo}", "Origen": col, "Regla": regla,
+     "Denominador": f"{col}_d" if tipo == 'n' else None, "Temática": tematica if tipo == 'n' else None}
+    for col, tematica in [("SS1", "superior1"), ("SS2", "superior2"), ("SC1", "compañeros1"),
+                          ("SC2", "compañeros2"), ("SW1", "oficina1"), ("SW3", "oficina2")]
+    for tipo, regla in [('n', 'protector'), ('d', 'respondida')]
+]
+
+
+def _distinto_de_0(values):
+    return np.where(values != 0, 1, 0)
+
+
+def _suma(values):
+    return np.nansum(values, axis=1)
+
+
+def _protector(values):
+    return np.where(np.isin(values, [0, 1]), 1, np.where(values == 5, np.nan, 0))
+
+
+def _respondida(values):
+    return np.where(np.isin(values, [0, 1, 2, 3, 4]), 1, 0)
+
+
+REGLAS = {
+    'distinto_de_0': _distinto_de_0,
+    'suma': _suma,
+    'protector': _protector,
+    'respondida': _respondida,
+}
+
+
+def add_indicators(df, indicators):
+    """
+    Calcula las columnas de los indicadores como expresiones vectorizadas y las agrega al DataFrame.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas (se modifica y se retorna).
+    indicators (list): Definiciones de indicadores (por ejemplo VIOLENCIA o PROTECTORES).
+
+    Retorna:
+    pd.DataFrame: DataFrame con una columna por indicador.
+    """
+    computed = {}
+    for indicator in indicators:
+        sources = indicator['Origen']
+        if isinstance(sources, list):
+            values = np.column_stack([
+                computed[col] if col in computed else df[col].to_numpy(dtype='float64', na_value=np.nan)
+                for col in sources
+            ])
+        else:
+            values = computed.get(sources)
+            if values is None:
+                values = df[sources].to_numpy(dtype='float64', na_value=np.nan)
+        result = REGLAS[indicator['Regla']](values)
+        # Enteros cuando no hay vacíos, igual que las columnas calculadas fila a fila
+        if not np.isnan(result).any():
+            result = result.astype('int64')
+        computed[indicator['Codpreg']] = result
+
+    df[list(computed)] = pd.DataFrame(computed, index=df.index)
+    return df
+
+
+def _reported(indicators):
+    return [indicator for indicator in indicators if indicator['Temática'] is not None]
+
+
+def _groups(df, key):
+    # Grupos en orden ascendente y CdT de la primera fila de cada grupo
+    first_rows = df.dropna(subset=[key]).drop_duplicates(key).sort_values(key, kind='stable')
+    return first_rows[key].reset_index(drop=True), first_rows['CdT'].astype(object).reset_index(drop=True)
+
+
+def _count_values(df, columns, key, value):
+    return df[columns].eq(value).groupby(df[key]).sum().to_numpy()
+
+
+def exposure_table(df, indicators=VIOLENCIA, key='CUV'):
+    """
+    Porcentaje de expuestos y no expuestos por CUV para cada indicador de exposición.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas con las columnas de add_indicators.
+    indicators (list): Definiciones de indicadores; se informan los que tienen Temática.
+    key (str): Columna de agrupación.
+
+    Retorna:
+    pd.DataFrame: Columnas CUV, CdT, Codpreg, Valor, Exposición, Porcentaje, Respuestas, Temática.
+    """
+    reported = _reported(indicators)
+    columns = [indicator['Codpreg'] for indicator in reported]
+    keys, cdts = _groups(df, key)
+    totals = df.groupby(key).size().to_numpy()[:, np.newaxis, np.newaxis]
+    counts = np.stack([_count_values(df, columns, key, 0), _count_values(df, columns, key, 1)], axis=2)
+    n_groups, n_columns = len(keys), len(columns)
+
+    return pd.DataFrame({
+        key: keys.repeat(n_columns * 2).reset_index(drop=True),
+        'CdT': cdts.repeat(n_columns * 2).reset_index(drop=True),
+        'Codpreg': np.tile(np.repeat(columns, 2), n_groups),
+        'Valor': np.tile([0, 1], n_groups * n_columns),
+        'Exposición': np.tile(["No expuesto", "Expuesto"], n_groups * n_columns),
+        'Porcentaje': np.round(counts / totals * 100, 2).ravel(),
+        'Respuestas': counts.ravel(),
+        'Temática': np.tile(np.repeat([indicator['Temática'] for indicator in reported], 2), n_groups),
+    })
+
+
+def exposure_means(df, indicators=VIOLENCIA, key='CUV'):
+    """
+    Proporción de expuestos por CUV para cada indicador de exposición.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas con las columnas de add_indicators.
+    indicators (list): Definiciones de indicadores; se informan los que tienen Temática.
+    key (str): Columna de agrupación.
+
+    Retorna:
+    pd.DataFrame: Columna key y una columna '<indicador>_mean' por indicador.
+    """
+    columns = [indicator['Codpreg'] for indicator in _reported(indicators)]
+    means = df.groupby(key)[columns].mean()
+    means.columns = [f"{col}_mean" for col in columns]
+    return means.reset_index()
+
+
+def protection_table(df, indicators=PROTECTORES, key='CUV'):
+    """
+    Porcentaje de protección por CUV: respuestas del numerador sobre respuestas válidas del denominador.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas con las columnas de add_indicators.
+    indicators (list): Definiciones de indicadores; se informan los que tienen Denominador.
+    key (str): Columna de agrupación.
+
+    Retorna:
+    pd.DataFrame: Columnas CUV, CdT, Codpreg, Exposición, Valor, Porcentaje, Respuestan, Respuestad, Temática.
+    """
+    reported = [indicator for indicator in indicators if indicator.get('Denominador')]
+    numerators = [indicator['Codpreg'] for indicator in reported]
+    denominators = [indicator['Denominador'] for indicator in reported]
+    keys, cdts = _groups(df, key)
+    counts = np.stack([_count_values(df, numerators, key, 0), _count_values(df, numerators, key, 1)], axis=2)
+    answered = np.repeat(_count_values(df, denominators, key, 1)[:, :, np.newaxis], 2, axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(answered != 0, np.round(counts / answered * 100, 2), 0)
+    n_groups, n_columns = len(keys), len(numerators)
+
+    return pd.DataFrame({
+        key: keys.repeat(n_columns * 2).reset_index(drop=True),
+        'CdT': cdts.repeat(n_columns * 2).reset_index(drop=True),
+        'Codpreg': np.tile(np.repeat(numerators, 2), n_groups),
+        'Exposición': np.tile(["No Proteccion", "Proteccion"], n_groups * n_columns),
+        'Valor': np.tile([0, 1], n_groups * n_columns),
+        'Porcentaje': percentages.ravel(),
+        'Respuestan': counts.ravel(),
+        'Respuestad': answered.ravel(),
+        'Temática': np.tile(np.repeat([indicator['Temática'] for indicator in reported], 2), n_groups),
+    })
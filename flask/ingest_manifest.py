@@ -0,0 +1,152 @@
+# ingest_manifest.py
+
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_sha256(file_path, block_size=1 << 20):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo.
+
+    Parámetros:
+    file_path (str): Ruta del archivo.
+    block_size (int): Tamaño de bloque de lectura en bytes.
+
+    Retorna:
+    str: Hash hexadecimal del contenido.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    Registro de los archivos ya procesados y caché en Parquet de su hoja BaseCompleta.
+
+    Para cada archivo se guarda ruta, tamaño, mtime, hash del contenido y versión del
+    cargador. Un archivo se considera vigente si su tamaño y mtime no cambiaron, o si su
+    hash coincide con el registrado (por ejemplo, un archivo copiado de nuevo sin
+    cambios), y si fue leído con la misma versión del cargador. Solo los archivos nuevos
+    o modificados deben volver a leerse.
+
+    La caché de cada archivo se identifica por nombre, hash y versión: el DataFrame
+    incluye RUT, CUV y CdT tomados del nombre, así que dos archivos con el mismo
+    contenido y distinto nombre no comparten caché.
+
+    Parámetros:
+    cache_dir (str): Carpeta del manifiesto y de la caché.
+    version (str): Versión del cargador (ver data_loading.loader_version).
+    """
+
+    def __init__(self, cache_dir, version=''):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.path = os.path.join(cache_dir, MANIFEST_NAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.entries = {}
+        self._hashes = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"No se pudo leer el manifiesto {self.path}; se reconstruirá: {e}")
+
+    def _cache_path(self, file_name, sha256, version):
+        key = hashlib.sha256(f"{file_name}\0{sha256}\0{version}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def is_current(self, file_name, size, mtime):
+        """
+        Indica si un archivo ya fue procesado con este tamaño y mtime y con la versión actual del cargador.
+        """
+        entry = self.entries.get(file_name)
+        return (entry is not None and (entry['size'], entry['mtime']) == (size, mtime)
+                and entry.get('version') == self.version)
+
+    def _hash(self, file_path):
+        if file_path not in self._hashes:
+            self._hashes[file_path] = file_sha256(file_path)
+        return self._hashes[file_path]
+
+    def load(self, folder_path, file_name):
+        """
+        Retorna el DataFrame en caché de un archivo si sigue vigente.
+
+        Parámetros:
+        folder_path (str): Carpeta del archivo.
+        file_name (str): Nombre del archivo.
+
+        Retorna:
+        pd.DataFrame: DataFrame en caché, o None si el archivo es nuevo o cambió.
+        """
+        file_path = os.path.join(folder_path, file_name)
+        entry = self.entries.get(file_name)
+        if entry is None or entry.get('version') != self.version:
+            return None
+
+        stat = os.stat(file_path)
+        if (entry['size'], entry['mtime']) != (stat.st_size, stat.st_mtime):
+            if self._hash(file_path) != entry['sha256']:
+                return None
+            entry.update(path=file_path, size=stat.st_size, mtime=stat.st_mtime)
+
+        cache_path = self._cache_path(file_name, entry['sha256'], self.version)
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            logging.warning(f"Caché inválida para {file_name}: {e}")
+            return None
+
+    def store(self, folder_path, file_name, df):
+        """
+        Guarda el DataFrame de un archivo en la caché y actualiza su entrada.
+
+        Parámetros:
+        folder_path (str): Carpeta del archivo.
+        file_name (str): Nombre del archivo.
+        df (pd.DataFrame): DataFrame leído del archivo.
+        """
+        file_path = os.path.join(folder_path, file_name)
+        stat = os.stat(file_path)
+        sha256 = self._hash(file_path)
+        cache_path = self._cache_path(file_name, sha256, self.version)
+        try:
+            df.to_parquet(cache_path, index=False)
+        except Exception as e:
+            # Columnas con tipos mezclados no siempre se pueden escribir en Parquet
+            logging.warning(f"No se pudo guardar en caché el archivo {file_name}: {e}")
+            return
+
+        # La caché anterior del archivo (otro contenido o versión) ya no se usará
+        previous = self.entries.get(file_name)
+        if previous is not None:
+            previous_path = self._cache_path(file_name, previous['sha256'], previous.get('version', ''))
+            if previous_path != cache_path and os.path.exists(previous_path):
+                os.remove(previous_path)
+
+        self.entries[file_name] = {
+            'path': file_path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': sha256,
+            'version': self.version,
+        }
+
+    def save(self):
+        """Escribe el manifiesto en disco."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
@@ -4,10 +4,11 @@ import logging
 
 # Importar funciones de los módulos
 from flask.data_loading import load_excel_files, create_age_range
+from flask.cuv_index import CuvIndex
+from flask.validation import validate_answers
 from flask.data_processing import (
     calculate_scores,
     create_summary,
-    calculate_percentage_responses,
 )
 from flask.report_generation import (
     generate_main_chart,
@@ -17,7 +18,7 @@ from flask.report_generation import (
 from flask import config
 
 
-def main():
+def main(cuvs=None, ruts=None):
     # Configuración de logging
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -27,25 +28,27 @@ def main():
     resultados_path = config.RESULTADOS_PATH
     output_archivos = config.OUTPUT_ARCHIVOS
 
-    # Cargar datos estáticos
-    df_ceal = config.DF_CEAL
-    df_risk_intervals = config.DF_RISK_INTERVALS
-
-    # Paso 1: Cargar y procesar los datos
+    # Paso 1: Cargar y procesar los datos (opcionalmente, solo los CUV o RUT indicados)
     logging.info("Cargando y procesando datos...")
-    combined_df = load_excel_files(folder_path)
+    file_names = None
+    if cuvs is not None or ruts is not None:
+        file_names = CuvIndex(config.INDEX_PATH).update(folder_path).files(cuvs=cuvs, ruts=ruts)
+        logging.info(f"{len(file_names)} archivos seleccionados para los CUV/RUT indicados.")
+        if not file_names:
+            logging.warning("Ningún archivo corresponde a los CUV/RUT indicados; no hay nada que procesar.")
+            return
+    combined_df = load_excel_files(folder_path, workers=config.INGEST_WORKERS,
+                                   cache_dir=config.CACHE_PATH, file_names=file_names)
+    combined_df, _ = validate_answers(combined_df, report_path=config.QUARANTINE_PATH)
     combined_df = create_age_range(combined_df)
 
     # Paso 2: Calcular puntajes y niveles de riesgo
     logging.info("Calculando puntajes y niveles de riesgo...")
-    combined_df = calculate_scores(combined_df, df_ceal, df_risk_intervals)
-    summary_df, df_resultados_porcentaje = create_summary(combined_df, df_ceal, df_risk_intervals)
-
-    # Paso 3: Calcular porcentajes de respuestas
-    logging.info("Calculando porcentajes de respuestas...")
-    df_resultados_porcentaje = calculate_percentage_responses(combined_df, df_ceal, df_risk_intervals)
+    combined_df = calculate_scores(combined_df)
+    # create_summary retorna también los porcentajes de respuestas por nivel de riesgo
+    summary_df, df_resultados_porcentaje = create_summary(combined_df)
 
-    # Paso 4: Generar informes y gráficos
+    # Paso 3: Generar informes y gráficos
     logging.info("Generando informes y gráficos...")
     for cuv in summary_df['CUV'].unique():
         # Obtener datos específicos para el CUV
@@ -66,7 +69,7 @@ def main():
             output_file
         )
 
-    # Paso 5: Guardar resultados en Excel
+    # Paso 4: Guardar resultados en Excel
     logging.info("Guardando resultados en Excel...")
     combined_df.to_excel(output_path, index=False)
 
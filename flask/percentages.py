@@ -0,0 +1,127 @@
+# percentages.py
+
+import numpy as np
+import pandas as pd
+
+from flask.risk_levels import LEVELS
+
+NIVEL_MAPPING = {'Bajo': 1, 'Medio': 2, 'Alto': 3}
+VALUE_COLUMNS = ['Dimensión', 'Nivel', 'Nivel_n', 'Porcentaje', 'Respuestas']
+
+
+def level_counts(df, risk_columns, keys):
+    """
+    Cuenta las respuestas por grupo, dimensión y nivel de riesgo en una sola agrupación.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas con una columna de nivel de riesgo por dimensión.
+    risk_columns (dict): {columna de nivel de riesgo: dimensión}.
+    keys (list): Columnas de agrupación (por ejemplo ['CUV'] o ['CUV', 'TE3']).
+
+    Retorna:
+    pd.Series: Conteos indexados por keys + ['Dimensión', 'Nivel'].
+    """
+    long = df.melt(id_vars=keys, value_vars=list(risk_columns), var_name='Dimensión', value_name='Nivel')
+    long['Dimensión'] = long['Dimensión'].map(risk_columns)
+    return long.groupby(keys + ['Dimensión', 'Nivel'], observed=True).size()
+
+
+def percentage_table(counts, totals, dimensions, keys, first_cdt=None):
+    """
+    Arma la tabla de porcentajes por nivel de riesgo a partir de conteos agregados.
+
+    Cada grupo de totals recibe una fila por dimensión y nivel (Bajo, Medio, Alto),
+    aunque no tenga respuestas en ese nivel.
+
+    Parámetros:
+    counts (pd.Series): Conteos retornados por level_counts (o la suma de varios).
+    totals (pd.Series): Denominador, indexado por keys (filas del grupo) o por
+                        keys + ['Dimensión'] (respuestas con nivel por dimensión).
+    dimensions (list): Dimensiones, en el orden de salida.
+    keys (list): Columnas de agrupación.
+    first_cdt (pd.Series, opcional): CdT de cada grupo, indexado por keys.
+
+    Retorna:
+    pd.DataFrame: Columnas keys[0], [CdT], keys[1:], Dimensión, Nivel, Nivel_n, Porcentaje, Respuestas.
+    """
+    groups = totals.index.to_frame(index=False)[keys].drop_duplicates(ignore_index=True)
+    n_groups, per_group = len(groups), len(dimensions) * len(LEVELS)
+    table = groups.loc[np.repeat(np.arange(n_groups), per_group)].reset_index(drop=True)
+    table['Dimensión'] = np.tile(np.repeat(np.asarray(dimensions, dtype=object), len(LEVELS)), n_groups)
+    table['Nivel'] = np.tile(np.asarray(LEVELS, dtype=object), n_groups * len(dimensions))
+
+    table = table.merge(counts.rename('Respuestas').reset_index(), on=keys + ['Dimensión', 'Nivel'], how='left')
+    table['Respuestas'] = table['Respuestas'].fillna(0).astype('int64')
+    table = table.merge(totals.rename('Total').reset_index(), on=list(totals.index.names), how='left')
+    total = table['Total'].fillna(0).to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['Porcentaje'] = np.where(total > 0, np.round(table['Respuestas'] / total * 100, 2), 0)
+    table['Nivel_n'] = table['Nivel'].map(NIVEL_MAPPING)
+
+    columns = keys + VALUE_COLUMNS
+    if first_cdt is not None:
+        table = table.merge(first_cdt.rename('CdT').reset_index(), on=keys, how='left')
+        columns = keys[:1] + ['CdT'] + keys[1:] + VALUE_COLUMNS
+    table = table[columns]
+
+    # Las claves categóricas se devuelven como valores simples, igual que antes
+    for col in table.columns:
+        if isinstance(table[col].dtype, pd.CategoricalDtype):
+            table[col] = table[col].astype(object)
+    return table
+
+
+def risk_level_percentages(df, risk_columns, keys, denominator='rows', cdt_column='CdT'):
+    """
+    Calcula Respuestas y Porcentaje por grupo, dimensión y nivel de riesgo para todos los grupos a la vez.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas con una columna de nivel de riesgo por dimensión.
+    risk_columns (dict): {columna de nivel de riesgo: dimensión}, en el orden de salida.
+    keys (list): Columnas de agrupación, por ejemplo ['CUV'] o ['CUV', 'TE3'].
+    denominator (str): 'rows' divide por las filas del grupo; 'answered' divide por
+                       las filas del grupo con nivel de riesgo en la dimensión.
+    cdt_column (str, opcional): Columna cuyo primer valor por grupo se agrega como 'CdT';
+                                None para omitirla.
+
+    Retorna:
+    pd.DataFrame: Tabla con el esquema de percentage_table.
+    """
+    keys = list(keys)
+    counts = level_counts(df, risk_columns, keys)
+    if denominator == 'rows':
+        totals = df.groupby(keys, observed=True).size()
+    elif denominator == 'answered':
+        answered = df[list(risk_columns)].notna().groupby([df[key] for key in keys], observed=True).sum()
+        answered.columns = [risk_columns[col] for col in answered.columns]
+        totals = answered.stack()
+        totals.index = totals.index.set_names(keys + ['Dimensión'])
+    else:
+        raise ValueError(f"Denominador no válido: {denominator}")
+
+    first_cdt = None
+    if cdt_column:
+        first_rows = df.dropna(subset=keys).drop_duplicates(keys)
+        first_cdt = first_rows.set_index(keys)[cdt_column]
+    return percentage_table(counts, totals, list(risk_columns.values()), keys, first_cdt)
+
+
+def mark_winning_level(df, keys, column='Puntaje'):
+    """
+    Conserva el puntaje solo en el nivel ganador de cada grupo.
+
+    El nivel ganador es la fila con el mayor puntaje del grupo (la primera, en
+    caso de empate); las demás filas del grupo quedan con puntaje vacío.
+
+    Parámetros:
+    df (pd.DataFrame): Tabla de porcentajes con la columna de puntaje (se modifica y se retorna).
+    keys (list): Columnas que definen el grupo, por ejemplo ['CUV', 'Dimensión'].
+    column (str): Columna de puntaje.
+
+    Retorna:
+    pd.DataFrame: La misma tabla, con el puntaje solo en los niveles ganadores.
+    """
+    ranked = df.dropna(subset=[column] + list(keys)).sort_values(column, ascending=False, kind='stable')
+    winners = ranked.drop_duplicates(subset=keys).index
+    df[column] = df[column].where(df.index.isin(winners))
+    return df
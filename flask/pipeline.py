@@ -0,0 +1,147 @@
+# pipeline.py
+
+import hashlib
+import inspect
+import logging
+import os
+import time
+
+import pandas as pd
+
+
+class Stage:
+    """
+    Etapa de un pipeline: una función con nombre y las etapas de las que recibe sus entradas.
+
+    Parámetros:
+    name (str): Nombre de la etapa.
+    func (callable): Función que recibe las salidas de `inputs`, en ese orden.
+    inputs (list): Nombres de las etapas de entrada.
+    fingerprint (callable, opcional): Solo para etapas de origen (sin entradas): retorna
+                                      una huella de los datos externos, o None si no se
+                                      puede calcular (en ese caso la etapa no usa caché).
+    deps (list, opcional): Funciones, clases, módulos o datos (tuplas, dicts) de los que depende
+                           la función además de su propio código; se incluyen en la huella,
+                           de modo que un cambio en ellos invalida la caché de la etapa.
+    cache (bool): False para etapas con efectos (por ejemplo, escribir archivos), que se
+                  ejecutan siempre y no se guardan en caché.
+    """
+
+    def __init__(self, name, func, inputs=(), fingerprint=None, deps=(), cache=True):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.fingerprint = fingerprint
+        self.deps = list(deps)
+        self.cache = cache
+
+    @staticmethod
+    def _source(obj):
+        # Código fuente de funciones, clases y módulos; representación de los datos
+        if inspect.ismodule(obj) or inspect.isclass(obj) or inspect.isroutine(obj):
+            try:
+                return inspect.getsource(obj)
+            except (OSError, TypeError):
+                return getattr(obj, '__qualname__', getattr(obj, '__name__', repr(obj)))
+        return repr(obj)
+
+    def code_hash(self):
+        digest = hashlib.sha256()
+        for obj in [self.func, *self.deps]:
+            digest.update(self._source(obj).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+
+class Pipeline:
+    """
+    Ejecuta etapas en orden y guarda la salida de cada una en caché.
+
+    La huella de una etapa combina su nombre, el código de su función y de sus deps,
+    y las huellas de sus entradas (o la huella de origen, para las etapas sin entradas).
+    Si existe una salida en caché con la misma huella, se reutiliza; así, al volver a
+    ejecutar, solo se recalculan las etapas afectadas por lo que cambió y las posteriores.
+    """
+
+    def __init__(self, stages, cache_dir=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, name, fingerprint):
+        return os.path.join(self.cache_dir, f"{name}-{fingerprint[:16]}.pkl")
+
+    def _remove_stale(self, name, keep_path):
+        # Solo se conserva la salida más reciente de cada etapa
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.startswith(f"{name}-") and entry.name.endswith('.pkl') and entry.path != keep_path:
+                os.remove(entry.path)
+
+    def _fingerprint(self, stage, input_fingerprints):
+        if stage.fingerprint is not None:
+            source = stage.fingerprint()
+            if source is None:
+                return None
+            input_fingerprints = [str(source)]
+        if any(fp is None for fp in input_fingerprints):
+            return None
+        digest = hashlib.sha256()
+        for part in [stage.name, stage.code_hash(), *input_fingerprints]:
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def run(self, targets=None, force=()):
+        """
+        Ejecuta las etapas necesarias para obtener `targets`.
+
+        Parámetros:
+        targets (list, opcional): Etapas a obtener. Por defecto, todas.
+        force (iterable): Etapas a recalcular aunque estén en caché, junto con todas las
+                          etapas que dependen de ellas.
+
+        Retorna:
+        dict: {nombre de etapa: salida} de las etapas ejecutadas o leídas de caché.
+        """
+        force = set(force)
+        unknown = force - set(self.stages)
+        if unknown:
+            raise ValueError(f"Etapas desconocidas: {sorted(unknown)}")
+        outputs, fingerprints, forced = {}, {}, {}
+
+        def resolve(name):
+            if name in outputs:
+                return
+            stage = self.stages[name]
+            for input_name in stage.inputs:
+                resolve(input_name)
+
+            fingerprint = self._fingerprint(stage, [fingerprints[i] for i in stage.inputs])
+            fingerprints[name] = fingerprint
+            # Una etapa forzada obliga a recalcular las que dependen de ella
+            forced[name] = name in force or any(forced[i] for i in stage.inputs)
+            cached = stage.cache and self.cache_dir and fingerprint
+            path = self._cache_path(name, fingerprint) if cached else None
+            if path and not forced[name] and os.path.exists(path):
+                try:
+                    outputs[name] = pd.read_pickle(path)
+                    logging.info(f"Etapa '{name}': leída de caché.")
+                    return
+                except Exception as e:
+                    logging.warning(f"Caché inválida para la etapa '{name}': {e}")
+
+            start = time.perf_counter()
+            outputs[name] = stage.func(*(outputs[i] for i in stage.inputs))
+            logging.info(f"Etapa '{name}': calculada en {time.perf_counter() - start:.1f} s.")
+            if path:
+                try:
+                    pd.to_pickle(outputs[name], path)
+                except Exception as e:
+                    logging.warning(f"No se pudo guardar en caché la etapa '{name}': {e}")
+                else:
+                    self._remove_stale(name, path)
+
+        for name in targets or list(self.stages):
+            resolve(name)
+        return outputs
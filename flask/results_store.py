@@ -0,0 +1,149 @@
+# results_store.py
+
+import logging
+import os
+
+import pandas as pd
+
+# Tablas de resultados: las hojas de combined_output.xlsx, en el mismo orden, y el cubo de conteos
+SHEET_NAMES = [
+    'basecompleta',
+    'recuentopreguntas',
+    'top_glosas',
+    'resultado',
+    'violencia',
+    'protectores',
+    'expoviolencia',
+    'Summary',
+    'df_porcentajes_niveles',
+    'df_res_dimTE3',
+    'df_resumen',
+    'cubo_niveles',
+    'cubo_celdas',
+]
+
+
+def is_results_store(path):
+    """
+    Indica si una ruta corresponde a un almacén de resultados (carpeta de archivos Parquet).
+
+    Parámetros:
+    path: Ruta o archivo cargado.
+
+    Retorna:
+    bool: True si la ruta es una carpeta existente.
+    """
+    return isinstance(path, (str, os.PathLike)) and os.path.isdir(path)
+
+
+def _table_path(store_path, name):
+    return os.path.join(store_path, f"{name}.parquet")
+
+
+def _to_parquet(df, path):
+    try:
+        df.to_parquet(path, index=False)
+    except Exception as e:
+        # Columnas object con tipos mezclados: se guardan como texto
+        logging.warning(f"Convirtiendo columnas mixtas a texto para {os.path.basename(path)}: {e}")
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        df.to_parquet(path, index=False)
+
+
+def write_results(tables, store_path, excel_path=None):
+    """
+    Guarda las tablas de resultados como archivos Parquet (una tabla por hoja).
+
+    Parámetros:
+    tables (dict): Diccionario {nombre de hoja: DataFrame}.
+    store_path (str): Carpeta de destino del almacén de resultados.
+    excel_path (str, opcional): Si se indica, exporta además las tablas a un archivo xlsx.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    for name, df in tables.items():
+        _to_parquet(df, _table_path(store_path, name))
+        logging.info(f"Tabla '{name}' guardada en {store_path} ({len(df)} filas).")
+
+    if excel_path:
+        with pd.ExcelWriter(excel_path, engine='xlsxwriter') as writer:
+            for name, df in tables.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+        logging.info(f"Tablas exportadas a {excel_path}.")
+
+
+def read_table(store_path, name, columns=None):
+    """
+    Lee una tabla del almacén de resultados.
+
+    Parámetros:
+    store_path (str): Carpeta del almacén de resultados.
+    name (str): Nombre de la tabla (nombre de la hoja original).
+    columns (list, opcional): Columnas a leer. Si no se indica, se leen todas.
+
+    Retorna:
+    pd.DataFrame: Tabla leída.
+    """
+    return pd.read_parquet(_table_path(store_path, name), columns=columns)
+
+
+def table_columns(store_path, name):
+    """
+    Lista las columnas de una tabla del almacén de resultados sin leer sus datos.
+
+    Parámetros:
+    store_path (str): Carpeta del almacén de resultados.
+    name (str): Nombre de la tabla.
+
+    Retorna:
+    list: Nombres de las columnas. Lanza FileNotFoundError si la tabla no existe.
+    """
+    import pyarrow.parquet as pq
+
+    return pq.read_schema(_table_path(store_path, name)).names
+
+
+def read_results(store_path, names=None):
+    """
+    Lee varias tablas del almacén de resultados.
+
+    Parámetros:
+    store_path (str): Carpeta del almacén de resultados.
+    names (list, opcional): Tablas a leer. Por defecto, todas las disponibles.
+
+    Retorna:
+    dict: Diccionario {nombre: DataFrame}.
+    """
+    if names is None:
+        names = [name for name in SHEET_NAMES if os.path.exists(_table_path(store_path, name))]
+    return {name: read_table(store_path, name) for name in names}
+
+
+def upsert_partitions(store_path, name, df, key='CUV', values=None):
+    """
+    Reemplaza en una tabla del almacén las filas de los valores de key presentes en df.
+
+    Las filas de otros valores de key se conservan. Si la tabla no existe, se crea.
+
+    Parámetros:
+    store_path (str): Carpeta del almacén de resultados.
+    name (str): Nombre de la tabla.
+    df (pd.DataFrame): Filas nuevas de las particiones a reemplazar.
+    key (str): Columna que define las particiones.
+    values (list, opcional): Particiones a reemplazar. Por defecto, los valores de key en df;
+                             una partición indicada aquí y ausente de df queda eliminada.
+
+    Retorna:
+    pd.DataFrame: Tabla actualizada.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    path = _table_path(store_path, name)
+    if values is None:
+        values = df[key].unique()
+    if os.path.exists(path):
+        existing = pd.read_parquet(path)
+        existing = existing[~existing[key].astype(str).isin(pd.Series(values).astype(str))]
+        df = pd.concat([existing, df], ignore_index=True)
+    _to_parquet(df, path)
+    return df
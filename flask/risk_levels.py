@@ -0,0 +1,66 @@
+# risk_levels.py
+
+import numpy as np
+import pandas as pd
+
+LEVELS = ['Bajo', 'Medio', 'Alto']
+INTERVAL_COLUMNS = ['Nivel de riesgo bajo', 'Nivel de riesgo medio', 'Nivel de riesgo alto']
+
+
+def compile_risk_intervals(df_risk_intervals):
+    """
+    Convierte los intervalos de riesgo en arreglos de límites, una sola vez.
+
+    Parámetros:
+    df_risk_intervals (pd.DataFrame): Intervalos de riesgo por dimensión.
+
+    Retorna:
+    dict: {dimensión: np.ndarray de forma (3, 2)} con [mínimo, máximo] de Bajo, Medio y Alto.
+    """
+    return {
+        row['Dimensión']: np.array([row[col] for col in INTERVAL_COLUMNS], dtype='float64')
+        for _, row in df_risk_intervals.iterrows()
+    }
+
+
+def classify_scores(scores, bounds, out_of_range='Fuera de rango'):
+    """
+    Asigna el nivel de riesgo a un arreglo de puntajes.
+
+    Un puntaje recibe el primer nivel cuyo intervalo cerrado lo contiene; si no
+    cae en ninguno (o está vacío), recibe out_of_range.
+
+    Parámetros:
+    scores (array): Puntajes, de forma (n,) o (n, d) para d dimensiones.
+    bounds (array): Límites de forma (3, 2), o (d, 3, 2) si scores tiene d columnas.
+    out_of_range (str): Etiqueta para los puntajes fuera de todos los intervalos.
+
+    Retorna:
+    np.ndarray: Etiquetas con la misma forma que scores.
+    """
+    values = np.asarray(scores, dtype='float64')[..., np.newaxis]
+    bounds = np.asarray(bounds, dtype='float64')
+    inside = (values >= bounds[..., 0]) & (values <= bounds[..., 1])
+    index = np.where(inside.any(axis=-1), inside.argmax(axis=-1), len(LEVELS))
+    return np.array(LEVELS + [out_of_range], dtype=object)[index]
+
+
+def classify_dimensions(df, coddim_to_dimension, intervals, out_of_range='Fuera de rango'):
+    """
+    Clasifica todas las columnas de puntaje por dimensión en una sola operación.
+
+    Parámetros:
+    df (pd.DataFrame): DataFrame con una columna de puntaje por Coddim.
+    coddim_to_dimension (dict): {Coddim: dimensión}; solo se clasifican las dimensiones con intervalos.
+    intervals (dict): Límites retornados por compile_risk_intervals.
+    out_of_range (str): Etiqueta para los puntajes fuera de todos los intervalos.
+
+    Retorna:
+    pd.DataFrame: Una columna de niveles por Coddim, con el mismo índice que df.
+    """
+    coddims = [coddim for coddim, dimension in coddim_to_dimension.items() if dimension in intervals]
+    if not coddims:
+        return pd.DataFrame(index=df.index)
+    bounds = np.stack([intervals[coddim_to_dimension[coddim]] for coddim in coddims])
+    labels = classify_scores(df[coddims].to_numpy(dtype='float64', na_value=np.nan), bounds, out_of_range)
+    return pd.DataFrame(labels, index=df.index, columns=coddims)
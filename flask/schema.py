@@ -0,0 +1,66 @@
+# schema.py
+
+import logging
+
+import pandas as pd
+
+# Columnas identificadoras y de texto repetitivo, almacenadas como categóricas
+CATEGORY_COLUMNS = [
+    'RUT', 'RUT_empleador', 'CdT', 'CDT_glosa', 'TE3',
+    'Nombre Empresa', 'CIIU', 'CIIU CT', 'Genero', 'Rango Edad',
+]
+
+# Tipos declarados por tabla (nombre de hoja / sufijo de la tabla informe_CEAL__)
+SCHEMAS = {
+    'basecompleta': {'CUV': 'Int64', **{col: 'category' for col in CATEGORY_COLUMNS}},
+    'fileresultados': {'CUV': 'Int64', **{col: 'category' for col in CATEGORY_COLUMNS}},
+    'Summary': {'CUV': 'Int64', 'CdT': 'category'},
+    'resultado': {'CUV': 'Int64', 'CdT': 'category'},
+    'df_porcentajes_niveles': {'CUV': 'Int64', 'CdT': 'category', 'TE3': 'category'},
+    'df_res_dimTE3': {'CUV': 'Int64', 'CdT': 'category', 'TE3': 'category'},
+    'df_resumen': {'CUV': 'Int64', 'CdT': 'category', 'TE3': 'category'},
+    'top_glosas': {'CUV': 'Int64'},
+    'recuentopreguntas': {'CUV': 'Int64'},
+    'violencia': {'CUV': 'Int64', 'CdT': 'category'},
+    'protectores': {'CUV': 'Int64', 'CdT': 'category'},
+    'expoviolencia': {'CUV': 'Int64'},
+}
+
+
+def apply_schema(df, table, cuv_dtype='Int64'):
+    """
+    Convierte las columnas de un DataFrame a los tipos declarados para su tabla.
+
+    Las columnas se buscan por su nombre original y por su nombre en SQL Server
+    (espacios y guiones reemplazados por '_'). Las columnas que no existen se ignoran.
+
+    Parámetros:
+    df (pd.DataFrame): DataFrame a convertir (se modifica y se retorna).
+    table (str): Nombre de la tabla, con o sin el prefijo 'informe_CEAL__'.
+    cuv_dtype (str): Tipo de la columna CUV; 'category' conserva el CUV como texto.
+
+    Retorna:
+    pd.DataFrame: DataFrame con los tipos declarados.
+    """
+    schema = SCHEMAS.get(table.replace('informe_CEAL__', ''))
+    if schema is None or df.empty:
+        return df
+
+    for col, dtype in schema.items():
+        if col == 'CUV':
+            dtype = cuv_dtype
+        for name in (col, col.replace(' ', '_').replace('-', '_')):
+            if name not in df.columns or df[name].dtype == dtype:
+                continue
+            try:
+                if col == 'CUV' and dtype == 'category' and pd.api.types.is_numeric_dtype(df[name]):
+                    # Tablas con CUV numérico en SQL: se deja como texto, igual que en las tablas NVARCHAR
+                    df[name] = df[name].astype('Int64').astype('string').astype('category')
+                elif dtype == 'Int64':
+                    df[name] = pd.to_numeric(df[name], errors='coerce').astype('Int64')
+                else:
+                    df[name] = df[name].astype(dtype)
+            except (TypeError, ValueError) as e:
+                logging.warning(f"No se pudo convertir la columna '{name}' de {table} a {dtype}: {e}")
+            break
+    return df
@@ -0,0 +1,159 @@
+# streaming.py
+
+import logging
+
+import pandas as pd
+
+from flask import config
+from flask.db import get_db_connection
+from flask.results_store import write_results
+from flask.validation import validate_answers
+from flask.risk_levels import classify_scores
+from flask.percentages import VALUE_COLUMNS, level_counts, percentage_table
+from flask.answer_matrix import AnswerMatrix, dimension_scores
+from flask.catalog import CATALOG
+
+# Renombre de columnas de informeCEAL_combinado (igual que en Procesarbase)
+COLUMN_RENAMES = {'CdT': 'CDT_Glosa', 'DD1': 'Genero', 'DD2': 'Edad', 'TE1': 'CdT', 'TE1.1': 'TE1'}
+
+# Agrupaciones calculadas por bloque: tabla de salida -> columnas de agrupación
+GROUPINGS = {
+    'resultado': ['CUV'],
+    'df_porcentajes_niveles': ['CUV', 'TE3'],
+}
+
+
+def scoring_columns(catalog=CATALOG):
+    """
+    Retorna las columnas de informeCEAL_combinado necesarias para el puntaje CEAL.
+
+    Parámetros:
+    catalog (CealCatalog): Catálogo CEAL.
+
+    Retorna:
+    list: Nombres de columna tal como están en la base de datos.
+    """
+    database_names = {new: old for old, new in COLUMN_RENAMES.items()}
+    columns = ['CUV', 'CdT', 'CDT_Glosa', 'TE3'] + list(catalog.codpregs)
+    return [database_names.get(col, col) for col in columns]
+
+
+def fetch_chunks(connection, columns=None, chunksize=None, table=None):
+    """
+    Lee una tabla por bloques de filas.
+
+    Parámetros:
+    connection: Conexión abierta a la base de datos.
+    columns (list, opcional): Columnas a seleccionar. Por defecto, todas.
+    chunksize (int, opcional): Filas por bloque; por defecto config.CHUNK_SIZE.
+    table (str, opcional): Tabla a leer; por defecto config.COMBINADO_TABLE.
+
+    Retorna:
+    generator: DataFrames de a lo más chunksize filas.
+    """
+    columns_sql = ", ".join(f"[{col}]" for col in columns) if columns else "*"
+    query = f"SELECT {columns_sql} FROM {table or config.COMBINADO_TABLE}"
+    yield from pd.read_sql(query, connection, chunksize=chunksize or config.CHUNK_SIZE)
+
+
+def score_chunk(df, catalog=CATALOG, row_offset=0):
+    """
+    Calcula los subtotales y niveles de riesgo por dimensión de un bloque.
+
+    Aplica los mismos renombres y reglas que Procesarbase: CdT combina el
+    centro de trabajo y su glosa, y las respuestas inválidas se tratan como vacías.
+
+    Parámetros:
+    df (pd.DataFrame): Bloque leído de informeCEAL_combinado.
+    catalog (CealCatalog): Catálogo CEAL.
+    row_offset (int): Filas leídas antes de este bloque. Cada bloque de fetch_chunks
+        se numera desde 0, así que el índice se desplaza en row_offset para que la
+        columna Fila del reporte de cuarentena identifique la fila en toda la tabla.
+
+    Retorna:
+    pd.DataFrame: Bloque con columnas '<Coddim>' y '<Coddim>_riesgo'.
+    """
+    df = df.rename(columns=COLUMN_RENAMES)
+    df.index = pd.RangeIndex(row_offset, row_offset + len(df))
+    cdt = df['CdT'].astype(str).str.strip()
+    cdt_glosa = df['CDT_Glosa'].astype(str).str.strip()
+    df['CdT'] = cdt.where(cdt == cdt_glosa, cdt_glosa + ' - ' + cdt)
+
+    df, _ = validate_answers(df, catalog, config.QUARANTINE_PATH)
+
+    answers = AnswerMatrix.from_frame(df, catalog.codpregs)
+    scores = dimension_scores(answers, catalog.coddim_to_codpreg, catalog.incidence)
+    for coddim in catalog.coddims:
+        df[coddim] = scores[coddim]
+        dimension = catalog.coddim_to_dimension[coddim]
+        if dimension in catalog.intervals:
+            df[f'{coddim}_riesgo'] = classify_scores(df[coddim].to_numpy(dtype='float64'), catalog.intervals[dimension],
+                                                     out_of_range='fuera de rango')
+    return df
+
+
+def aggregate_risk_levels(chunks, catalog=CATALOG):
+    """
+    Puntúa cada bloque a medida que llega y acumula los conteos por nivel de riesgo.
+
+    Solo se conservan los conteos por CUV (y por CUV y TE3), de modo que la
+    memoria usada depende del tamaño del bloque y no del total de filas.
+
+    Parámetros:
+    chunks (iterable): Bloques de informeCEAL_combinado.
+    catalog (CealCatalog): Catálogo CEAL.
+
+    Retorna:
+    dict: {'resultado': DataFrame por CUV, 'df_porcentajes_niveles': DataFrame por CUV y TE3},
+          con las columnas CUV, CdT, [TE3], Dimensión, Nivel, Nivel_n, Porcentaje, Respuestas.
+    """
+    dimensions = {f'{coddim}_riesgo': catalog.coddim_to_dimension[coddim] for coddim in catalog.scored_coddims}
+
+    counts = {name: None for name in GROUPINGS}
+    totals = {name: None for name in GROUPINGS}
+    first_cdt = {name: None for name in GROUPINGS}
+    rows = 0
+
+    for chunk in chunks:
+        chunk = score_chunk(chunk, catalog, row_offset=rows)
+        rows += len(chunk)
+        for name, keys in GROUPINGS.items():
+            chunk_counts = level_counts(chunk, dimensions, keys)
+            chunk_totals = chunk.groupby(keys).size()
+            chunk_cdt = chunk.groupby(keys)['CdT'].first()
+            if counts[name] is None:
+                counts[name], totals[name], first_cdt[name] = chunk_counts, chunk_totals, chunk_cdt
+            else:
+                counts[name] = counts[name].add(chunk_counts, fill_value=0)
+                totals[name] = totals[name].add(chunk_totals, fill_value=0)
+                first_cdt[name] = first_cdt[name].combine_first(chunk_cdt)
+        logging.info(f"{rows} filas procesadas.")
+
+    results = {}
+    for name, keys in GROUPINGS.items():
+        if totals[name] is None:
+            columns = keys[:1] + ['CdT'] + keys[1:] + VALUE_COLUMNS
+            results[name] = pd.DataFrame(columns=columns)
+            continue
+        results[name] = percentage_table(counts[name], totals[name], list(dimensions.values()), keys, first_cdt[name])
+    return results
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    connection = get_db_connection()
+    if connection is None:
+        return
+    try:
+        chunks = fetch_chunks(connection, scoring_columns())
+        results = aggregate_risk_levels(chunks)
+    finally:
+        connection.close()
+
+    write_results(results, config.STREAMING_OUTPUT_PATH)
+    logging.info("Proceso por bloques completado.")
+
+
+if __name__ == "__main__":
+    main()
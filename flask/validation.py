@@ -0,0 +1,109 @@
+# validation.py
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from flask.catalog import CATALOG
+
+# Valores permitidos por pregunta. Por defecto la escala Likert 0-4; las preguntas de
+# apoyo social admiten además 5 ("no tengo superior / compañeros").
+DEFAULT_ALLOWED_VALUES = (0, 1, 2, 3, 4)
+ALLOWED_VALUES = {col: (0, 1, 2, 3, 4, 5) for col in ['SS1', 'SS2', 'SC1', 'SC2', 'SW1', 'SW3']}
+
+REPORT_COLUMNS = ['Fila', 'CUV', 'Codpreg', 'Valor']
+
+
+def question_columns(df, catalog=CATALOG):
+    """
+    Retorna las preguntas del catálogo CEAL presentes en el DataFrame.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas.
+    catalog (CealCatalog): Catálogo CEAL.
+
+    Retorna:
+    list: Columnas de preguntas, en el orden del catálogo.
+    """
+    return [col for col in catalog.codpregs if col in df.columns]
+
+
+def _numeric_matrix(answers):
+    # Las columnas ya numéricas se toman tal cual; solo las de texto pasan por to_numeric
+    matrix = np.empty(answers.shape, dtype='float64')
+    for j, col in enumerate(answers.columns):
+        values = answers[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values, errors='coerce')
+        matrix[:, j] = values.to_numpy(dtype='float64', na_value=np.nan)
+    return matrix
+
+
+def validate_answers(df, catalog=CATALOG, report_path=None):
+    """
+    Valida y convierte a número todas las respuestas del catálogo CEAL en una sola pasada.
+
+    Una respuesta es inválida si no es numérica o si no está entre los valores
+    permitidos de su pregunta. Las respuestas inválidas quedan vacías (NaN) y se
+    informan en el reporte de cuarentena; las vacías en origen no se informan.
+
+    Parámetros:
+    df (pd.DataFrame): Respuestas recién cargadas (se modifica y se retorna).
+    catalog (CealCatalog): Catálogo CEAL.
+    report_path (str, opcional): Archivo CSV donde se agregan las respuestas inválidas.
+
+    Retorna:
+    tuple: (DataFrame validado, DataFrame de cuarentena con columnas Fila, CUV, Codpreg, Valor)
+    """
+    columns = question_columns(df, catalog)
+    if not columns or df.empty:
+        return df, pd.DataFrame(columns=REPORT_COLUMNS)
+
+    answers = df[columns]
+    matrix = _numeric_matrix(answers)
+    missing = answers.isna().to_numpy()
+
+    valid = np.isnan(matrix) & missing
+    allowed_sets = {}
+    for j, col in enumerate(columns):
+        allowed_sets.setdefault(ALLOWED_VALUES.get(col, DEFAULT_ALLOWED_VALUES), []).append(j)
+    for allowed, idx in allowed_sets.items():
+        valid[:, idx] |= np.isin(matrix[:, idx], allowed)
+
+    rows, cols = np.nonzero(~valid)
+    report = pd.DataFrame({
+        'Fila': df.index[rows],
+        'CUV': df['CUV'].to_numpy()[rows] if 'CUV' in df.columns else None,
+        'Codpreg': np.asarray(columns, dtype=object)[cols],
+        'Valor': answers.to_numpy()[rows, cols],
+    }, columns=REPORT_COLUMNS)
+
+    matrix[rows, cols] = np.nan
+    has_nan = np.isnan(matrix).any(axis=0)
+    df[columns] = pd.DataFrame(matrix, index=df.index, columns=columns)
+    for col in np.asarray(columns)[~has_nan]:
+        df[col] = df[col].astype('int64')
+
+    if not report.empty:
+        logging.warning(f"{len(report)} respuestas inválidas en {report['Fila'].nunique()} filas; "
+                        f"se dejaron vacías.")
+        if report_path:
+            write_quarantine_report(report, report_path)
+    return df, report
+
+
+def write_quarantine_report(report, report_path):
+    """
+    Agrega las respuestas inválidas al reporte de cuarentena (CSV).
+
+    Parámetros:
+    report (pd.DataFrame): Respuestas inválidas retornadas por validate_answers.
+    report_path (str): Ruta del archivo CSV.
+    """
+    exists = os.path.exists(report_path)
+    # BOM solo al crear el archivo, para que Excel reconozca UTF-8
+    report.to_csv(report_path, mode='a', header=not exists, index=False,
+                  encoding='utf-8' if exists else 'utf-8-sig')
+    logging.info(f"Reporte de cuarentena actualizado: {report_path}")
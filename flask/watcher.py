@@ -0,0 +1,187 @@
+# watcher.py
+
+import logging
+import os
+import time
+
+import pandas as pd
+
+from flask import config
+from flask.cuv_index import CuvIndex
+from flask.data_loading import load_excel_file, create_age_range, loader_version
+from flask.data_processing import calculate_scores, create_summary
+from flask.ingest_manifest import IngestManifest
+from flask.results_store import upsert_partitions
+from flask.validation import validate_answers
+
+# Tablas del almacén que publica el vigilante. Tienen el formato de create_summary, distinto
+# del de las tablas 'Summary' y 'resultado' de Procesarbase, por eso usan sus propios nombres
+SUMMARY_TABLE = 'Summary_carpeta'
+RESULTADO_TABLE = 'resultado_carpeta'
+
+
+class FolderWatcher:
+    """
+    Vigila la carpeta de tablas y procesa los archivos Excel nuevos a medida que llegan.
+
+    La carpeta se revisa por sondeo (os.scandir), lo que funciona igual en
+    discos locales y unidades sincronizadas. Un archivo solo se procesa cuando
+    su tamaño y mtime no cambian durante `debounce` segundos, para no leer
+    archivos que aún se están copiando. Los archivos ya procesados se reconocen
+    mediante el manifiesto de ingesta, por lo que un reinicio no repite trabajo.
+
+    Cada CUV afectado se recalcula con todos sus archivos (no solo los recién llegados),
+    usando el índice de CUV, y sus filas se reemplazan en SUMMARY_TABLE y RESULTADO_TABLE.
+    """
+
+    def __init__(self, folder_path, cache_dir, store_path, interval=None, debounce=None, index_path=None):
+        self.folder_path = folder_path
+        self.store_path = store_path
+        self.interval = interval if interval is not None else config.WATCH_INTERVAL
+        self.debounce = debounce if debounce is not None else config.WATCH_DEBOUNCE
+        self.manifest = IngestManifest(cache_dir, version=loader_version())
+        self.index = CuvIndex(index_path or config.INDEX_PATH)
+        # archivo -> ((tamaño, mtime), instante en que se observó esa firma por primera vez)
+        self._pending = {}
+        # archivo -> (tamaño, mtime) con que falló; se reintenta solo si el archivo cambia
+        self._failed = {}
+
+    def poll(self):
+        """
+        Revisa la carpeta una vez.
+
+        Retorna:
+        list: Archivos nuevos o modificados cuyo contenido ya está estable.
+        """
+        now = time.monotonic()
+        seen = set()
+        ready = []
+        with os.scandir(self.folder_path) as it:
+            for entry in it:
+                # '~$' son archivos de bloqueo de Excel
+                if not entry.name.endswith('.xlsx') or entry.name.startswith('~$') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                signature = (stat.st_size, stat.st_mtime)
+                seen.add(entry.name)
+                if self.manifest.is_current(entry.name, *signature) or self._failed.get(entry.name) == signature:
+                    self._pending.pop(entry.name, None)
+                    continue
+                self._failed.pop(entry.name, None)
+
+                previous = self._pending.get(entry.name)
+                if previous is None or previous[0] != signature:
+                    self._pending[entry.name] = (signature, now)
+                elif now - previous[1] >= self.debounce:
+                    ready.append(entry.name)
+
+        for file_name in set(self._pending) - seen:
+            del self._pending[file_name]
+        return sorted(ready)
+
+    def group_by_cuv(self, file_names):
+        """
+        Agrupa los archivos por CUV según el índice de CUV (actualizado con la carpeta).
+
+        Parámetros:
+        file_names (list): Archivos de la carpeta vigilada.
+
+        Retorna:
+        tuple: ({cuv: [archivo, ...]}, [archivos sin CUV en el nombre]).
+        """
+        self.index.update(self.folder_path)
+        groups, unknown = {}, []
+        for file_name in file_names:
+            cuv = self.index.entries.get(file_name, {}).get('cuv')
+            if cuv:
+                groups.setdefault(cuv, []).append(file_name)
+            else:
+                unknown.append(file_name)
+        return groups, unknown
+
+    def _load(self, file_name):
+        # Desde la caché de ingesta si el archivo no cambió; si no, se lee y se guarda en caché
+        df = self.manifest.load(self.folder_path, file_name)
+        if df is None:
+            df = load_excel_file(self.folder_path, file_name)
+            if df is None:
+                raise ValueError(f"No se pudo leer el archivo {file_name}.")
+            self.manifest.store(self.folder_path, file_name, df)
+        return df
+
+    def process(self, cuvs):
+        """
+        Recalcula los CUV indicados con todos sus archivos y publica sus resultados.
+
+        Las filas de estos CUV se reemplazan en SUMMARY_TABLE y RESULTADO_TABLE; el
+        resto de las filas se conserva.
+
+        Parámetros:
+        cuvs (list): CUV a recalcular.
+        """
+        file_names = self.index.files(cuvs=cuvs)
+        combined_df = pd.concat([self._load(file_name) for file_name in file_names], ignore_index=True)
+        combined_df, _ = validate_answers(combined_df, report_path=config.QUARANTINE_PATH)
+        combined_df = create_age_range(combined_df)
+        combined_df = calculate_scores(combined_df)
+
+        summary_df, df_resultados_porcentaje = create_summary(combined_df)
+
+        upsert_partitions(self.store_path, SUMMARY_TABLE, summary_df, values=cuvs)
+        upsert_partitions(self.store_path, RESULTADO_TABLE, df_resultados_porcentaje, values=cuvs)
+        self.manifest.save()
+        logging.info(f"CUV {', '.join(map(str, cuvs))} actualizados con {len(file_names)} archivos.")
+
+    def _fail(self, file_names, reason):
+        logging.error(reason)
+        for file_name in file_names:
+            signature = self._pending.pop(file_name, (None,))[0]
+            if signature is not None:
+                self._failed[file_name] = signature
+
+    def run(self, max_polls=None):
+        """
+        Revisa la carpeta en bucle y procesa los archivos listos, un CUV a la vez.
+
+        Un error al procesar un CUV se registra y no detiene el vigilante; sus archivos
+        no se reintentan hasta que cambien.
+
+        Parámetros:
+        max_polls (int, opcional): Número de revisiones; por defecto, indefinidamente.
+        """
+        logging.info(f"Vigilando {self.folder_path} cada {self.interval} s.")
+        polls = 0
+        while max_polls is None or polls < max_polls:
+            try:
+                ready = self.poll()
+                groups, unknown = self.group_by_cuv(ready) if ready else ({}, [])
+            except OSError as e:
+                # Unidad de red no disponible momentáneamente
+                logging.error(f"Error al revisar {self.folder_path}: {e}")
+                groups, unknown = {}, []
+            if unknown:
+                self._fail(unknown, f"Archivos sin CUV en el nombre, se omiten: {', '.join(unknown)}")
+            for cuv, file_names in groups.items():
+                try:
+                    self.process([cuv])
+                except Exception as e:
+                    logging.exception(f"Error al procesar el CUV {cuv}: {e}")
+                    self._fail(file_names, f"Archivos omitidos hasta que cambien: {', '.join(file_names)}")
+                else:
+                    for file_name in file_names:
+                        self._pending.pop(file_name, None)
+            polls += 1
+            time.sleep(self.interval)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    watcher = FolderWatcher(config.FOLDER_PATH, config.CACHE_PATH, config.RESULTS_STORE_PATH)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logging.info("Vigilancia detenida.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ import logging
 import os
 from dotenv import load_dotenv
 
+from flask.db_pool import ConnectionPool
+
 # Cargar variables de entorno desde un archivo .env (asegúrate de tener este archivo configurado)
 load_dotenv()
 
@@ -41,6 +43,15 @@ def get_db_connection():
         return None
 
 
+# Pool de conexiones compartido por todas las sesiones de la aplicación
+@st.cache_resource
+def obtener_pool():
+    """
+    Retorna el pool de conexiones del proceso, para no abrir una conexión nueva por consulta.
+    """
+    return ConnectionPool(get_db_connection)
+
+
 # Función para consultar una tabla específica por CUV
 def consultar_tabla(tabla, cuv):
     """
@@ -54,21 +65,14 @@ def consultar_tabla(tabla, cuv):
     - DataFrame con los resultados de la consulta.
     """
     query = f"SELECT * FROM {tabla} WHERE CUV = ?"
-    connection = get_db_connection()
-
-    if connection:
-        try:
+    try:
+        with obtener_pool().connection() as connection:
             df = pd.read_sql(query, connection, params=[cuv])
-            logging.info(f"Consulta ejecutada en la tabla '{tabla}' para CUV: {cuv}")
-            return df
-        except Exception as e:
-            st.error(f"Error al consultar la tabla '{tabla}': {e}")
-            logging.error(f"Error al consultar la tabla '{tabla}': {e}")
-            return pd.DataFrame()
-        finally:
-            connection.close()
-            logging.info("Conexión a la base de datos cerrada.")
-    else:
+        logging.info(f"Consulta ejecutada en la tabla '{tabla}' para CUV: {cuv}")
+        return df
+    except Exception as e:
+        st.error(f"Error al consultar la tabla '{tabla}': {e}")
+        logging.error(f"Error al consultar la tabla '{tabla}': {e}")
         return pd.DataFrame()
 
 